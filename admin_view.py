@@ -0,0 +1,53 @@
+import hmac
+import os
+
+import streamlit as st
+
+import http_client
+import job_queue
+import metrics
+
+# หน้าแอดมินแบบฝังท้ายแอป: เปิดด้วย ?admin=<METRICS_TOKEN> (ไม่ตั้ง METRICS_TOKEN = ปิดถาวร)
+
+
+def _token():
+    try:
+        return st.secrets.get("METRICS_TOKEN", "") or ""
+    except Exception:  # ไม่มี secrets.toml
+        return os.environ.get("METRICS_TOKEN", "")
+
+
+def render():
+    token = _token()
+    if not token or not hmac.compare_digest(st.query_params.get("admin", ""), token):
+        return
+    st.divider()
+    st.subheader("📊 Metrics (แอดมิน)")
+    jobs = job_queue.counts()
+    st.caption(f"คิวงาน: worker {job_queue.workers_alive()} ตัว · " +
+               " · ".join(f"{status} {jobs.get(status, 0)}" for status in ('queued', 'running', 'done', 'failed')))
+    hosts = http_client.latency_histograms()
+    if hosts:
+        # เก็บตลอด (ไม่ขึ้นกับ METRICS) — แถวละ host, คอลัมน์ละ bucket ของ latency
+        with st.expander("HTTP latency ต่อ host"):
+            st.dataframe([{'host': host, 'count': stats['count'],
+                           'avg_ms': round(stats['sum_ms'] / stats['count'], 1) if stats['count'] else 0,
+                           **stats['buckets']} for host, stats in sorted(hosts.items())],
+                         use_container_width=True, hide_index=True)
+    if not metrics.ENABLED:
+        st.info("ยังไม่ได้เปิดเก็บ metrics — รันแอปด้วย METRICS=1")
+        return
+    stages = metrics.snapshot()
+    if stages:
+        st.dataframe([{'stage': stage, **stats} for stage, stats in stages.items()],
+                     use_container_width=True, hide_index=True)
+    else:
+        st.caption("ยังไม่มี span")
+    with st.expander("span ล่าสุด"):
+        st.dataframe(metrics.recent(200), use_container_width=True, hide_index=True)
+    c1, c2, c3 = st.columns(3)
+    c1.download_button("⬇️ JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+    c2.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+    if c3.button("🗑️ ล้างค่า", key="metrics_reset"):
+        metrics.reset()
+        st.rerun()
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import time
+import urllib.parse
+
+import db
+
+# --- CONFIG ---
+CACHE_TTL = 6 * 60 * 60      # วินาที — ราคา/สต็อกเปลี่ยนบ่อย เลยไม่เก็บนานเกิน 6 ชม.
+CACHE_MAX_ENTRIES = 5000     # เกินนี้ไล่ตัวที่ไม่ได้ใช้นานสุดออก (LRU)
+
+# พารามิเตอร์ติดตาม/affiliate ที่ไม่เปลี่ยนตัวสินค้า
+TRACKING_PARAMS = {
+    "spm", "scm", "sp_atk", "xptdk", "uls_trackid", "mmp_pid", "gclid", "fbclid",
+    "laz_trackid", "trafficfrom", "clicktrackinfo", "from", "mp", "search", "freeshipping",
+    "_r", "_t", "u_code", "sender_device", "is_from_webapp", "preview_pb", "checksum",
+    "sec_user_id", "share_app_id", "share_item_id", "share_link_id", "timestamp",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    cache_key TEXT PRIMARY KEY,
+    url TEXT,
+    page_text TEXT,
+    result_json TEXT,
+    created_at REAL,
+    last_access REAL
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache(last_access);
+"""
+
+
+def canonicalize_url(url):
+    parts = urllib.parse.urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(("utm_", "share_"))
+    ]
+    query.sort()
+    path = parts.path.rstrip("/") or "/"
+    return urllib.parse.urlunsplit(("https", host, path, urllib.parse.urlencode(query), ""))
+
+
+def template_hash(template):
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(url, prompt_hash):
+    return hashlib.sha256(f"{canonicalize_url(url)}|{prompt_hash}".encode("utf-8")).hexdigest()
+
+
+def get(url, prompt_hash, ttl=CACHE_TTL):
+    # คืน (page_text, parsed) ถ้ายังไม่หมดอายุ ไม่งั้นคืน None
+    key = cache_key(url, prompt_hash)
+    now = time.time()
+    with db.session(schema=_SCHEMA) as conn:
+        row = conn.execute(
+            "SELECT page_text, result_json, created_at FROM analysis_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        if now - row[2] > ttl:
+            conn.execute("DELETE FROM analysis_cache WHERE cache_key = ?", (key,))
+            return None
+        conn.execute("UPDATE analysis_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+    return row[0], json.loads(row[1])
+
+
+def contains(url, prompt_hash, ttl=CACHE_TTL):
+    # เช็กเฉย ๆ ว่ามีผลที่ยังไม่หมดอายุไหม — อ่านอย่างเดียว ไม่แตะ last_access/ไม่ลบ (get ค่อยทำตอนใช้จริง)
+    with db.session(schema=_SCHEMA) as conn:
+        row = conn.execute("SELECT 1 FROM analysis_cache WHERE cache_key = ? AND created_at >= ?",
+                           (cache_key(url, prompt_hash), time.time() - ttl)).fetchone()
+    return row is not None
+
+
+def put(url, prompt_hash, page_text, parsed, max_entries=CACHE_MAX_ENTRIES):
+    key = cache_key(url, prompt_hash)
+    now = time.time()
+    with db.session(schema=_SCHEMA) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO analysis_cache (cache_key, url, page_text, result_json, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, canonicalize_url(url), page_text, json.dumps(parsed, ensure_ascii=False), now, now),
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()
+        if count > max_entries:
+            conn.execute(
+                "DELETE FROM analysis_cache WHERE cache_key IN "
+                "(SELECT cache_key FROM analysis_cache ORDER BY last_access LIMIT ?)",
+                (count - max_entries,),
+            )
+    return key
@@ -1,15 +1,13 @@
 import streamlit as st
-import random
-import urllib.parse
-import google.generativeai as genai
-import re
-from PIL import Image
-import requests
-from io import BytesIO
-from streamlit_image_coordinates import streamlit_image_coordinates
+
+import admin_view
+import metrics
+from studio_core import (THEMES, PREFETCH_ENABLED, create_pro_prompt, get_prefetcher, new_scene_image, scene_from_job,
+                         submit_scene)
 
 # --- 1. CONFIG ---
 st.set_page_config(page_title="SME Pro Studio v16.5", page_icon="🧼", layout="wide")
+metrics.serve()   # เปิด /metrics ถ้าตั้ง METRICS_PORT
 
 # --- CSS ---
 st.markdown("""
@@ -19,49 +17,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- 2. LOGIC ---
-THEMES = {
-    "✨ หรูหรา (Luxury)": "placed on a black marble table, golden lighting, elegant atmosphere",
-    "🌿 ธรรมชาติ (Organic)": "placed on a natural stone, surrounded by green leaves, soft sunlight",
-    "⚪ มินิมอล (Minimal)": "placed on a clean white podium, soft pastel background, studio lighting",
-    "🏙️ นีออน (Cyberpunk)": "neon lights background, blue and pink lighting, futuristic product shot"
-}
-
-LOCAL_DICT = {"สบู่": "soap bar", "ครีม": "cream jar", "เซรั่ม": "serum bottle", "น้ำหอม": "perfume bottle"}
-
-try:
-    genai.configure(api_key=st.secrets["GEMINI_KEYS"])
-    model_gemini = genai.GenerativeModel('gemini-1.5-flash')
-    gemini_ready = True
-except:
-    gemini_ready = False
-
-def create_pro_prompt(product_input, theme_key):
-    product_eng = product_input
-    for thai, eng in LOCAL_DICT.items():
-        if thai in product_eng: product_eng = product_eng.replace(thai, eng)
-    
-    # Geometry Lock (ล็อกทรงสบู่)
-    shape_fix = ""
-    if "soap" in product_eng.lower():
-        shape_fix = ", rectangular cuboid shape, sharp straight edges, symmetrical perspective, product packaging mockup, front view"
-    elif "box" in product_eng.lower() or "กล่อง" in product_input:
-         shape_fix = ", rectangular box, sharp corners, straight lines, packaging mockup"
-
-    theme_prompt = THEMES[theme_key]
-    full_prompt = f"Professional product photography of {product_eng}{shape_fix}, {theme_prompt}, blank product surface, no text, no label, 8k resolution, telephoto lens, architectural symmetry"
-    return full_prompt
-
-def load_image_from_url(url):
-    response = requests.get(url)
-    img = Image.open(BytesIO(response.content))
-    return img
-
 # --- INIT SESSION STATE (จำค่าตำแหน่ง) ---
 if 'logo_x' not in st.session_state: st.session_state.logo_x = 512
 if 'logo_y' not in st.session_state: st.session_state.logo_y = 512
 # เพิ่มตัวแปรจำค่าการคลิกล่าสุด เพื่อป้องกันการรีเฟรชรัวๆ
 if 'last_click_x' not in st.session_state: st.session_state.last_click_x = 0
+# เริ่มเติมคิวภาพ prefetch ตั้งแต่เปิดหน้า (ครั้งเดียวต่อ process)
+if PREFETCH_ENABLED: get_prefetcher()
 
 # --- 3. UI ---
 st.title("🛍️ SME Pro Studio (v16.5: จิ้มแล้วปรับต่อได้)")
@@ -76,25 +38,41 @@ with main_col1:
     
     if st.button("✨ สร้างฉากใหม่", use_container_width=True):
         if user_product:
-            with st.spinner("⏳ กำลังจัดแสงและล็อกรูปทรง..."):
-                final_prompt = create_pro_prompt(user_product, selected_theme)
-                seed = random.randint(1, 999999)
-                encoded = urllib.parse.quote(final_prompt)
-                image_url = f"https://image.pollinations.ai/prompt/{encoded}?width=1024&height=1024&model=flux&nologo=true&seed={seed}"
-                
-                st.session_state.generated_image = load_image_from_url(image_url)
+            final_prompt = create_pro_prompt(user_product, selected_theme)
+            # มี worker -> ส่งเข้าคิว กดอย่างอื่นระหว่างรอได้ งานไม่หาย (rerun รอบถัดไปรอผลต่อ); None = สร้างเองที่นี่
+            st.session_state.scene_pending = (final_prompt, submit_scene(final_prompt))
+
+    if 'scene_pending' in st.session_state:
+        final_prompt, job_id = st.session_state.scene_pending
+        with st.spinner("⏳ กำลังจัดแสงและล็อกรูปทรง..."):
+            try:
+                _, st.session_state.generated_image = (scene_from_job(job_id, final_prompt) if job_id
+                                                       else new_scene_image(final_prompt))
                 # รีเซ็ตตำแหน่งเข้ากลาง
                 st.session_state.logo_x = 512
                 st.session_state.logo_y = 512
                 st.success("✅ ได้ภาพแล้ว!")
+            except Exception:
+                st.error("❌ โหลดภาพไม่สำเร็จ ลองกดสร้างใหม่อีกครั้งครับ")
+        del st.session_state.scene_pending
 
 # === ฝั่งขวา: แต่งภาพ ===
 with main_col2:
     st.success("🖼️ 2. แปะโลโก้ (จิ้มหยาบ + ปรับละเอียด)")
     
     if 'generated_image' in st.session_state:
+        # PIL/ตัวจับคลิกโหลดเมื่อมีภาพให้แต่งแล้วเท่านั้น — หน้าแรกเปิดเร็วขึ้น
+        import logo_compose
+        from streamlit_image_coordinates import streamlit_image_coordinates
+
         uploaded_logo = st.file_uploader("เลือกไฟล์โลโก้ (PNG พื้นใส)", type=["png", "jpg"])
-        bg_image = st.session_state.generated_image.copy()
+        # Compositor ผูกกับภาพพื้นหลังหนึ่งภาพ — สร้างใหม่เมื่อได้ฉากใหม่เท่านั้น ไม่ copy ภาพ 1024px ทุก rerun
+        base = st.session_state.generated_image
+        if st.session_state.get('compositor') is None or st.session_state.compositor.base is not base:
+            st.session_state.compositor = logo_compose.Compositor(base)
+        compositor = st.session_state.compositor
+        logo_data = uploaded_logo.getvalue() if uploaded_logo else None
+        logo_size, rotation = 150, 0
         
         edit_c1, edit_c2 = st.columns([1.5, 1])
         
@@ -122,35 +100,30 @@ with main_col2:
 
         # --- โซนรูปภาพ (ซ้าย) ---
         with edit_c1:
-            if uploaded_logo:
-                logo = Image.open(uploaded_logo)
-                logo.thumbnail((logo_size, logo_size))
-                logo = logo.rotate(-rotation, expand=True, resample=Image.BICUBIC)
-                
-                # ใช้ค่าตำแหน่งจาก Session State (ซึ่งมาจาก Slider หรือ การคลิก)
-                logo_w, logo_h = logo.size
-                offset = (st.session_state.logo_x - logo_w//2, st.session_state.logo_y - logo_h//2)
-                
-                try:
-                    bg_image.paste(logo, offset, logo)
-                except:
-                    bg_image.paste(logo, offset)
-            
+            # preview ย่อ + วาดใหม่เฉพาะบริเวณโลโก้ (โลโก้ที่ย่อ/หมุนแล้วถูก cache ตาม ขนาด × มุม)
+            center = (st.session_state.logo_x, st.session_state.logo_y)
+            preview = compositor.render_preview(logo_data, logo_size, rotation, center)
+
             # --- Click Widget ---
             # ตัวจับการคลิก (Click-to-Place)
-            coords = streamlit_image_coordinates(bg_image, use_column_width=True)
+            coords = streamlit_image_coordinates(preview, use_column_width=True, image_format="JPEG", jpeg_quality=85)
             
             # ถ้ามีการคลิกใหม่ (ตำแหน่งไม่ซ้ำเดิม) ให้ขยับโลโก้ไปตรงนั้น
             if coords and coords["x"] != st.session_state.last_click_x:
-                st.session_state.logo_x = coords["x"]
-                st.session_state.logo_y = coords["y"]
+                # พิกัดที่ได้เป็นพิกัดบนภาพที่แสดงผล -> แปลงกลับเป็นพิกัดบนภาพเต็ม
+                shown_w = coords.get("width") or preview.width
+                shown_h = coords.get("height") or preview.height
+                st.session_state.logo_x, st.session_state.logo_y = compositor.to_full(
+                    coords["x"] * preview.width / shown_w, coords["y"] * preview.height / shown_h)
                 st.session_state.last_click_x = coords["x"]
                 st.rerun() # รีเฟรชหน้าจอ เพื่อให้ Slider ขยับตามไปที่ใหม่
 
-            buf = BytesIO()
-            bg_image.save(buf, format="PNG")
-            byte_im = buf.getvalue()
-            st.download_button(label="💾 บันทึกภาพ", data=byte_im, file_name="final_product.png", mime="image/png", use_container_width=True)
+            # PNG ความละเอียดเต็มสร้างตอนกดปุ่มเท่านั้น (Streamlit เรียก callable นี้ตอนคลิก)
+            full_args = (base, logo_data, logo_size, rotation, center)
+            st.download_button(label="💾 บันทึกภาพ", data=lambda: logo_compose.encode_png(logo_compose.compose_full(*full_args)),
+                               file_name="final_product.png", mime="image/png", use_container_width=True)
             
     else:
-        st.markdown("<div style='text-align:center; padding:50px; color:#aaa;'>👈 สร้างภาพที่ฝั่งซ้ายก่อนนะครับ</div>", unsafe_allow_html=True)
\ No newline at end of file
+        st.markdown("<div style='text-align:center; padding:50px; color:#aaa;'>👈 สร้างภาพที่ฝั่งซ้ายก่อนนะครับ</div>", unsafe_allow_html=True)
+
+admin_view.render()
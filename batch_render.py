@@ -0,0 +1,205 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from io import BytesIO
+
+import image_cache
+import logo_compose
+import product_store
+from studio_core import THEMES, create_pro_prompt
+
+# สร้างภาพแคตตาล็อกแบบไม่ต้องเปิดหน้าเว็บ: สินค้า × ธีม -> โหลดภาพ -> แปะโลโก้ -> บันทึก PNG
+#   python batch_render.py --db --themes Luxury Minimal --logo logo.png --out renders/
+# โหลดภาพด้วย thread (งาน I/O) ส่วนแปะโลโก้/encode PNG ทำใน process pool (งาน CPU ของ PIL)
+# ทำต่อจากที่ค้างได้ด้วย manifest.jsonl ในโฟลเดอร์ผลลัพธ์
+
+# --- CONFIG ---
+IO_WORKERS = 8
+CPU_WORKERS = os.cpu_count() or 2
+MANIFEST = "manifest.jsonl"
+
+
+def slugify(text):
+    # เก็บตัวอักษรไทย (รวมสระ/วรรณยุกต์) ไว้ด้วย — \w อย่างเดียวตัดสระบน/ล่างทิ้ง
+    return re.sub(r'[^\w\u0E00-\u0E7F]+', '-', text).strip('-').lower()[:60] or 'item'
+
+
+def theme_slug(theme_key):
+    # "✨ หรูหรา (Luxury)" -> "luxury"
+    m = re.search(r'\(([^)]+)\)', theme_key)
+    return slugify(m.group(1) if m else theme_key)
+
+
+def resolve_themes(names):
+    # รับชื่อเต็มหรือบางส่วน เช่น "Luxury" / "หรูหรา"; ไม่ระบุ = ทุกธีม
+    if not names:
+        return list(THEMES)
+    keys = []
+    for name in names:
+        match = [k for k in THEMES if name.lower() in k.lower()]
+        if not match:
+            raise SystemExit(f"ไม่รู้จักธีม: {name} (มี: {', '.join(THEMES)})")
+        keys.extend(k for k in match if k not in keys)
+    return keys
+
+
+def products_from_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        for row in csv.DictReader(fh):
+            name = (row.get('name') or '').strip()
+            if name:
+                yield name
+
+
+def products_from_db(category=None, limit=None, platform=None):
+    seen = set()
+    for row in product_store.iter_products(category=category, platform=platform):
+        name = (row['name'] or '').strip()
+        if name and name not in seen:
+            seen.add(name)
+            yield name
+            if limit and len(seen) >= limit:
+                return
+
+
+def item_id(product, theme_key):
+    return hashlib.sha1(f"{product}|{theme_key}".encode('utf-8')).hexdigest()[:16]
+
+
+def item_seed(product, theme_key):
+    # seed คงที่ต่อ (สินค้า, ธีม) รันซ้ำได้ภาพเดิม และใช้แคชภาพเดิมได้
+    return int(item_id(product, theme_key), 16) % 999999 + 1
+
+
+def load_manifest(out_dir):
+    done = set()
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    done.add(json.loads(line)['id'])
+                except (ValueError, KeyError):
+                    continue
+    return done
+
+
+def render_one(image_bytes, logo_bytes, logo_size, rotation, center, out_path):
+    # รันใน process pool — ใช้คณิตเดียวกับหน้าเว็บ (logo_compose)
+    from PIL import Image
+    base = Image.open(BytesIO(image_bytes))
+    base.load()
+    image = logo_compose.compose_full(base, logo_bytes, logo_size, rotation, center)
+    tmp = out_path + '.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(logo_compose.encode_png(image))
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def run_batch(products, theme_keys, out_dir, logo_bytes=None, logo_size=150, rotation=0, center=(512, 512),
+              io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS, progress=None):
+    # คืน dict สรุปผล; progress(done, total, item) ถูกเรียกทุกครั้งที่เสร็จหนึ่งภาพ
+    os.makedirs(out_dir, exist_ok=True)
+    done_ids = load_manifest(out_dir)
+    items = []
+    for product in products:
+        for theme in theme_keys:
+            iid = item_id(product, theme)
+            if iid not in done_ids:
+                items.append({'id': iid, 'product': product, 'theme': theme, 'seed': item_seed(product, theme)})
+                done_ids.add(iid)
+    total, rendered, failed = len(items), 0, []
+    t0 = time.monotonic()
+
+    def fetch(item):
+        prompt = create_pro_prompt(item['product'], item['theme'])
+        return image_cache.fetch(prompt, item['seed'])
+
+    max_inflight = io_workers + cpu_workers * 2   # จำกัดภาพที่ค้างในหน่วยความจำ
+    queue = iter(items)
+    with ThreadPoolExecutor(io_workers) as io_pool, ProcessPoolExecutor(cpu_workers) as cpu_pool, \
+            open(os.path.join(out_dir, MANIFEST), 'a', encoding='utf-8') as manifest:
+        pending = {}
+
+        def top_up():
+            while len(pending) < max_inflight:
+                item = next(queue, None)
+                if item is None:
+                    return
+                pending[io_pool.submit(fetch, item)] = ('fetch', item)
+
+        top_up()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage, item = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    failed.append({**item, 'error': str(e)[:200]})
+                    continue
+                if stage == 'fetch':
+                    name = f"{slugify(item['product'])}_{theme_slug(item['theme'])}_{item['seed']}.png"
+                    item['path'] = os.path.join(out_dir, name)
+                    pending[cpu_pool.submit(render_one, result, logo_bytes, logo_size, rotation, center,
+                                            item['path'])] = ('render', item)
+                else:
+                    manifest.write(json.dumps(item, ensure_ascii=False) + '\n')
+                    manifest.flush()
+                    rendered += 1
+                    if progress:
+                        progress(rendered, total, item)
+            top_up()
+
+    elapsed = time.monotonic() - t0
+    return {'total': total, 'rendered': rendered, 'failed': failed, 'seconds': round(elapsed, 2),
+            'images_per_minute': round(rendered / elapsed * 60, 1) if elapsed and rendered else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SME Pro Studio — สร้างภาพสินค้าทีละหลายรายการ")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--csv', help="ไฟล์ CSV ที่มีคอลัมน์ name")
+    src.add_argument('--db', action='store_true', help="อ่านสินค้าจากตาราง products ใน merchant_data.db")
+    parser.add_argument('--category', help="(กับ --db) เฉพาะหมวดนี้")
+    parser.add_argument('--platform', help="(กับ --db) เฉพาะแพลตฟอร์มนี้ เช่น Shopee")
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--themes', nargs='*', help="ชื่อธีม (บางส่วนก็ได้) ไม่ระบุ = ทุกธีม")
+    parser.add_argument('--logo', help="ไฟล์โลโก้ PNG")
+    parser.add_argument('--logo-size', type=int, default=150)
+    parser.add_argument('--rotation', type=int, default=0)
+    parser.add_argument('--x', type=int, default=512)
+    parser.add_argument('--y', type=int, default=512)
+    parser.add_argument('--out', default='renders')
+    parser.add_argument('--io-workers', type=int, default=IO_WORKERS)
+    parser.add_argument('--cpu-workers', type=int, default=CPU_WORKERS)
+    args = parser.parse_args(argv)
+
+    products = list(products_from_csv(args.csv) if args.csv
+                    else products_from_db(args.category, args.limit, args.platform))
+    themes = resolve_themes(args.themes)
+    logo_bytes = None
+    if args.logo:
+        with open(args.logo, 'rb') as fh:
+            logo_bytes = fh.read()
+
+    def progress(done, total, item):
+        print(f"[{done}/{total}] {item['path']}", file=sys.stderr)
+
+    summary = run_batch(products, themes, args.out, logo_bytes, args.logo_size, args.rotation, (args.x, args.y),
+                        args.io_workers, args.cpu_workers, progress)
+    for item in summary['failed']:
+        print(f"ล้มเหลว: {item['product']} / {item['theme']}: {item['error']}", file=sys.stderr)
+    print(f"เสร็จ {summary['rendered']}/{summary['total']} ภาพใน {summary['seconds']} วินาที "
+          f"({summary['images_per_minute']} ภาพ/นาที)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
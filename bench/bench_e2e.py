@@ -0,0 +1,171 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# load test แบบครบทั้งหน้า: สคริปต์ session ผ่าน Streamlit AppTest หลาย session พร้อมกัน
+# AppTest ใช้ Runtime ตัวเดียวต่อ process รันพร้อมกันหลาย thread ไม่ได้ จึงใช้ process ละ session ที่รันอยู่
+# (SQLite/แคชภาพบนดิสก์ใช้ร่วมกันเหมือนรัน Streamlit หลาย worker; เซิร์ฟเวอร์ปลอมอยู่ใน process หลัก)
+# ทุกบริการภายนอกเป็นของปลอมบน 127.0.0.1:
+#   หน้าสินค้า = fake_servers.PageHandler, pollinations = fake_servers.ImageHandler, Gemini = fake_genai
+#   krobjang: เปิดหน้า -> ใส่ลิงก์ใหม่ -> วิเคราะห์ (stream) -> วิเคราะห์ลิงก์เดิมซ้ำ (แคช)
+#   studio:   เปิดหน้า -> สร้างฉากใหม่ 2 ครั้ง
+# รายงาน latency ต่อ session/ต่อขั้น และ throughput ที่แต่ละระดับ concurrency
+#   python bench/bench_e2e.py --concurrency 1,4,16 --sessions 32 --json bench_e2e.json
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def summarize(samples):
+    return {'p50_ms': round(statistics.median(samples), 1), 'p95_ms': round(percentile(samples, 0.95), 1),
+            'max_ms': round(max(samples), 1), 'count': len(samples)} if samples else {'count': 0}
+
+
+def krobjang_session(n, url, steps, timeout):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'krobjang.py'), default_timeout=timeout)
+    at.session_state.gemini_key = 'AIzaBench'
+    # License Pro ต่อ session คนละใบ — ถังโควต้าไม่ชนกันระหว่าง session จำลอง (ทุก session มาจาก IP 'local')
+    at.session_state.is_pro = True
+    at.session_state.license_hash = f'bench{n:060d}'
+    t0 = time.perf_counter()
+    at.run()
+    steps['krobjang_open'] = (time.perf_counter() - t0) * 1000
+    for step in ('krobjang_analyze', 'krobjang_analyze_cached'):
+        at.text_input[2].input(url)
+        t0 = time.perf_counter()
+        [b for b in at.button if b.key == 'analyze'][0].click().run()
+        steps[step] = (time.perf_counter() - t0) * 1000
+        if at.exception or not at.success:
+            raise RuntimeError(f"{step}: {at.exception or [e.value for e in at.error + at.warning]}")
+
+
+def studio_session(n, url, steps, timeout):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=timeout)
+    t0 = time.perf_counter()
+    at.run()
+    steps['studio_open'] = (time.perf_counter() - t0) * 1000
+    at.text_input[0].input(['สบู่', 'ครีม', 'เซรั่ม', 'น้ำหอม'][n % 4])
+    for step in ('studio_new_scene', 'studio_new_scene_2'):
+        t0 = time.perf_counter()
+        at.button[0].click().run()
+        steps[step] = (time.perf_counter() - t0) * 1000
+        if at.exception or 'generated_image' not in at.session_state:
+            raise RuntimeError(f"{step}: {at.exception or [e.value for e in at.error]}")
+
+
+SCENARIOS = {'krobjang': krobjang_session, 'studio': studio_session}
+
+
+_model = None
+
+
+def init_child(first_token, token_latency):
+    # spawn ไม่ใช่ fork — process ลูกเริ่มสะอาด ไม่ติดล็อกของ thread เซิร์ฟเวอร์ปลอม; env (DB/แคช/URL) ส่งต่อมาเอง
+    global _model
+    import fake_genai
+    import streamlit.testing.v1   # โหลดล่วงหน้า ไม่ให้ไปนับรวมใน session แรกของ process
+    _model = fake_genai.install(first_token_latency=first_token, token_latency=token_latency)
+
+
+def run_session(job):
+    # รันใน process ลูก คืน (ms ทั้ง session หรือ None, {ขั้น: ms}, error, จำนวนครั้งที่เรียก Gemini)
+    scenario, n, url, timeout = job
+    model = _model
+    calls = model.calls
+    steps = {}
+    t0 = time.perf_counter()
+    try:
+        SCENARIOS[scenario](n, url, steps, timeout)
+        return (time.perf_counter() - t0) * 1000, steps, None, model.calls - calls
+    except Exception as e:
+        return None, steps, f"{type(e).__name__}: {e}"[:200], model.calls - calls
+
+
+def run_level(scenario, concurrency, urls, timeout, model_args):
+    totals, errors, steps = [], [], {}
+    calls = 0
+    jobs = [(scenario, n, url, timeout) for n, url in enumerate(urls)]
+    t0 = time.perf_counter()
+    # อ้างฟังก์ชันผ่านชื่อโมดูล bench_e2e ไม่ใช่ __main__ — AppTest แทน sys.modules['__main__'] ด้วยสคริปต์แอป
+    # ใน process ลูก ทำให้ unpickle งานถัดไปไม่เจอ run_session
+    import bench_e2e
+    with multiprocessing.get_context('spawn').Pool(concurrency, bench_e2e.init_child, model_args) as pool:
+        for total, session_steps, error, session_calls in pool.imap_unordered(bench_e2e.run_session, jobs):
+            calls += session_calls
+            for name, ms in session_steps.items():
+                steps.setdefault(name, []).append(ms)
+            if error:
+                errors.append(error)
+            else:
+                totals.append(total)
+    wall = time.perf_counter() - t0
+    return {'scenario': scenario, 'concurrency': concurrency, 'sessions': len(urls), 'errors': len(errors),
+            'error_samples': errors[:3], 'wall_s': round(wall, 2), 'gemini_calls': calls,
+            'sessions_per_s': round(len(totals) / wall, 3), 'session': summarize(totals),
+            'steps': {k: summarize(v) for k, v in steps.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', default='krobjang,studio')
+    parser.add_argument('--concurrency', default='1,4,16', help='จำนวน session พร้อมกัน คั่นด้วย ,')
+    parser.add_argument('--sessions', type=int, default=32, help='session ต่อระดับ concurrency')
+    parser.add_argument('--page-latency', type=float, default=0.2, help='วินาทีต่อหน้าสินค้า')
+    parser.add_argument('--image-latency', type=float, default=0.5, help='วินาทีต่อภาพ')
+    parser.add_argument('--first-token', type=float, default=0.4, help='วินาทีก่อน Gemini ส่ง token แรก')
+    parser.add_argument('--token-latency', type=float, default=0.005, help='วินาทีต่อ token')
+    parser.add_argument('--timeout', type=float, default=120, help='วินาทีต่อการรันสคริปต์หนึ่งครั้ง')
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args()
+
+    # ทุกอย่างเขียนลงโฟลเดอร์ชั่วคราว ต้องตั้งก่อน import โมดูลของแอป (อ่านค่าตอน import)
+    tmp = tempfile.mkdtemp(prefix='bench_e2e_')
+    os.environ['MERCHANT_DB'] = os.path.join(tmp, 'bench.db')
+    os.environ['IMAGE_CACHE_DIR'] = os.path.join(tmp, 'images')
+    import fake_servers
+    page_server, page_base = fake_servers.start(fake_servers.PageHandler, latency=args.page_latency)
+    image_server, image_base = fake_servers.start(fake_servers.ImageHandler, latency=args.image_latency)
+    os.environ['POLLINATIONS_BASE'] = image_base
+
+    levels = [int(c) for c in args.concurrency.split(',')]
+    results = []
+    item = 0
+    for scenario in args.scenarios.split(','):
+        for concurrency in levels:
+            # ลิงก์ใหม่ทุก session ทุกระดับ — ไม่ได้ผลจากแคชของรอบก่อน
+            urls = [fake_servers.page_url(page_base, fake_servers.PLATFORMS[i % 3], item + i)
+                    for i in range(args.sessions)]
+            item += args.sessions
+            r = run_level(scenario, concurrency, urls, args.timeout, (args.first_token, args.token_latency))
+            results.append(r)
+            print(f"{scenario:8} c={concurrency:<3} {r['sessions_per_s']:7.2f} session/s  "
+                  f"p50={r['session'].get('p50_ms', 0):8.0f}ms  p95={r['session'].get('p95_ms', 0):8.0f}ms  "
+                  f"errors={r['errors']}", file=sys.stderr)
+            for name, s in r['steps'].items():
+                print(f"    {name:26} p50={s['p50_ms']:8.0f}ms  p95={s['p95_ms']:8.0f}ms", file=sys.stderr)
+    page_server.shutdown()
+    image_server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'e2e', 'config': {'page_latency_s': args.page_latency,
+                                                      'image_latency_s': args.image_latency,
+                                                      'first_token_s': args.first_token,
+                                                      'token_latency_s': args.token_latency},
+                       'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
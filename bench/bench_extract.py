@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# เทียบ fetch_page_text แบบเดิม (BeautifulSoup ทั้งหน้า) กับ page_extract แบบอ่านทีละ chunk
+# บนหน้า fixture ที่เติม script ท้ายหน้าให้ใหญ่เท่าหน้าจริงของ Shopee/Lazada
+#   python bench/bench_extract.py --pad-mb 3 --json bench_extract.json
+
+FIXTURES = os.path.join(ROOT, 'bench', 'fixtures')
+PLATFORMS = ('shopee', 'lazada', 'tiktok')
+MODES = ('legacy-bs4', 'stream-stdlib', 'stream-lxml')
+
+
+def load_fixture(name, pad_mb):
+    with open(os.path.join(FIXTURES, f'{name}.html'), 'rb') as fh:
+        html = fh.read()
+    if pad_mb:
+        blob = b'<script>window.__chunk=' + b'"' + b'x' * (1024 * 1024) + b'";</script>'
+        html = html.replace(b'</body>', blob * pad_mb + b'</body>')
+    return html
+
+
+def _rss_kb(field):
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+
+def reset_peak():
+    # Linux: เขียน 5 ลง clear_refs = รีเซ็ต VmHWM เท่ากับ RSS ปัจจุบัน -> คืน baseline (KB)
+    # ไม่งั้น peak ตอน import/โหลดก่อนหน้าบังการแยกหน้าที่ใช้หน่วยความจำน้อยกว่า (แบบ stream วัดได้ 0)
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+        return _rss_kb('VmRSS')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def peak_since(base):
+    try:
+        return _rss_kb('VmHWM') - base
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+
+
+# หน้า fixture อยู่ในไฟล์ ไม่ได้อยู่ในหน่วยความจำของ worker — แบบเดิมอ่านทั้งก้อน (เหมือน requests.get)
+# แบบ stream อ่านทีละ chunk (เหมือน iter_content) ไม่มีก้อนหน้าเต็มค้างในหน่วยความจำก่อนวัด
+def legacy(path):
+    from bs4 import BeautifulSoup
+    with open(path, 'rb') as fh:
+        html = fh.read()
+    soup = BeautifulSoup(html.decode('utf-8', errors='replace'), 'html.parser')
+    for tag in soup(['script', 'style', 'nav', 'footer', 'header']):
+        tag.decompose()
+    return soup.get_text(separator=' ', strip=True)[:3000], len(html)
+
+
+def streaming(path):
+    import page_extract
+    with open(path, 'rb') as fh:
+        chunks = iter(lambda: fh.read(page_extract.CHUNK_SIZE), b'')
+        text, _, bytes_read = page_extract.extract_chunks(chunks)
+    return text, bytes_read
+
+
+def worker(mode, name, path, repeat):
+    # import ก่อนวัด baseline — peak RSS นับเฉพาะการแยกหน้า
+    if mode == 'legacy-bs4':
+        import bs4  # noqa: F401
+        run = legacy
+    else:
+        import page_extract
+        if mode == 'stream-stdlib':
+            page_extract._etree = None
+        elif page_extract._lxml() is None:
+            raise SystemExit('lxml ไม่ได้ติดตั้ง')
+        run = streaming
+    base_rss = reset_peak()
+    _, bytes_read = run(path)
+    peak_rss = peak_since(base_rss)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run(path)
+        times.append((time.perf_counter() - t0) * 1000)
+    return {'mode': mode, 'page': name, 'page_bytes': os.path.getsize(path), 'bytes_read': bytes_read,
+            'peak_rss_kb': peak_rss, 'ms_per_page': round(statistics.median(times), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pad-mb', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    parser.add_argument('--worker', nargs=3, metavar=('MODE', 'PAGE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(*args.worker, args.repeat)))
+        return
+
+    # แต่ละโหมดรันใน process แยก เพื่อให้ peak RSS ไม่ปนกัน
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in PLATFORMS:
+            path = os.path.join(tmp, f'{name}.html')
+            with open(path, 'wb') as fh:
+                fh.write(load_fixture(name, args.pad_mb))
+            for mode in MODES:
+                proc = subprocess.run([sys.executable, __file__, '--worker', mode, name, path,
+                                       '--repeat', str(args.repeat)],
+                                      capture_output=True, text=True)
+                if proc.returncode:
+                    print(f'{mode:14} {name:7} ข้าม: {proc.stderr.strip().splitlines()[-1]}')
+                    continue
+                results.append(json.loads(proc.stdout))
+
+    print(f"{'mode':14} {'page':7} {'page KB':>9} {'read KB':>9} {'peak RSS KB':>12} {'ms/page':>9}")
+    for r in results:
+        print(f"{r['mode']:14} {r['page']:7} {r['page_bytes'] // 1024:>9} {r['bytes_read'] // 1024:>9} "
+              f"{r['peak_rss_kb']:>12} {r['ms_per_page']:>9}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'extract', 'pad_mb': args.pad_mb, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
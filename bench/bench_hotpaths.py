@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# latency ของ hot path ทีละฟังก์ชันแบบออฟไลน์ (ไม่มีเน็ต): หน้าสินค้ามาจาก fake_servers.PageHandler บน 127.0.0.1
+#   create_pro_prompt, fetch_page_text (ต่อแพลตฟอร์ม), parse_result / parse_response (JSON),
+#   แปะโลโก้ (transform แบบ cache miss/hit, compose ภาพเต็ม, preview) และ encode PNG (preview 512 / เต็ม 1024)
+#   python bench/bench_hotpaths.py --runs 200 --json bench_hotpaths.json
+
+
+def timed(fn, runs):
+    samples = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {'p50_ms': round(statistics.median(samples), 4),
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+            'mean_ms': round(statistics.fmean(samples), 4), 'runs': runs}
+
+
+def logo_png(size=400):
+    from PIL import Image, ImageDraw
+    logo = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(logo).ellipse((20, 20, size - 20, size - 20), fill=(230, 40, 60, 255))
+    buf = BytesIO()
+    logo.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args()
+
+    os.environ['MERCHANT_DB'] = os.path.join(tempfile.mkdtemp(prefix='bench_hot_'), 'bench.db')
+    from PIL import Image
+    import fake_servers
+    import logo_compose
+    from bench_text import product_names, responses
+    from fake_genai import JSON_RESPONSE
+    from krobjang_core import fetch_page_text, parse_response, parse_result
+    from studio_core import THEMES, create_pro_prompt
+
+    server, base = fake_servers.start(fake_servers.PageHandler)
+    names = product_names(max(args.runs, 1000))
+    texts = responses(max(args.runs, 200))
+    themes = list(THEMES)
+    logo = logo_png()
+    base_image = Image.open(BytesIO(fake_servers.fake_png(1024, 7))).convert('RGB')
+    compositor = logo_compose.Compositor(base_image)
+    rnd = random.Random(3)
+
+    results = {
+        'create_pro_prompt': timed(lambda i: create_pro_prompt(names[i % len(names)], themes[i % len(themes)]),
+                                   args.runs * 10),
+        'parse_result': timed(lambda i: parse_result(texts[i % len(texts)]), args.runs * 10),
+        'parse_response_json': timed(lambda i: parse_response(JSON_RESPONSE, structured=True), args.runs * 10),
+    }
+    for platform in fake_servers.PLATFORMS:
+        results[f'fetch_page_text_{platform}'] = timed(
+            lambda i: fetch_page_text(fake_servers.page_url(base, platform, i)), args.runs)
+
+    def transform_cold(i):
+        logo_compose._transformed.clear()
+        logo_compose.transform_logo(logo, 100 + i % 300, rnd.randrange(-180, 180))
+
+    results['logo_transform_cold'] = timed(transform_cold, args.runs)
+    results['logo_transform_cached'] = timed(lambda i: logo_compose.transform_logo(logo, 150, 15), args.runs * 10)
+    results['preview_render'] = timed(lambda i: compositor.render_preview(logo, 150, i % 90, (100 + i % 800, 512)),
+                                      args.runs)
+    results['compose_full_1024'] = timed(lambda i: logo_compose.compose_full(base_image, logo, 150, 15, (512, 512)),
+                                         args.runs)
+    full = logo_compose.compose_full(base_image, logo, 150, 15, (512, 512))
+    results['png_encode_preview_512'] = timed(lambda i: logo_compose.encode_png(compositor.canvas), args.runs)
+    results['png_encode_full_1024'] = timed(lambda i: logo_compose.encode_png(full), max(10, args.runs // 4))
+    server.shutdown()
+
+    for name, r in results.items():
+        print(f"{name:26} p50={r['p50_ms']:9.4f}ms  p95={r['p95_ms']:9.4f}ms  ({r['runs']} รอบ)")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'hotpaths', 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ค่าใช้จ่ายของ metrics: ราคาของ span หนึ่งตัว และเวลาคำขอจำลองแบบออฟไลน์ของทั้งสองแอปตอนปิด/เปิด metrics
+#   krobjang: แยกข้อความจาก fixture HTML (span extract) + parse_response (span)
+#             ไม่นับ usage_stats.incr — การเขียน SQLite ทุกคำขอแกว่งกว่า overhead ที่จะวัดหลายเท่า (noise ~27%)
+#   studio:   transform_logo + encode_png ภาพ preview 512px (2 span)
+# วัดปิด/เปิดใน process เดียวกัน สลับกันทีละก้อนเล็ก (ROUNDS รอบ) แล้วเอาก้อนที่เร็วสุดของแต่ละฝั่ง:
+#   ปิด = metrics.ENABLED = False + ฟังก์ชันเดิมก่อนห่อ (__wrapped__) ซึ่งเท่ากับตอน import โดยไม่ตั้ง METRICS
+#   เครื่องช้าลง/เร็วขึ้นระหว่างทางกระทบทั้งสองฝั่งพอๆ กัน — วัดแยก process บนเครื่อง 1 core แกว่ง 25-35%
+# *_noise_pct = ฝั่งปิดวัดซ้ำอีกชุด (A/A) ต่างจากชุดแรกเท่าไร: overhead ที่เล็กกว่านี้แยกจาก noise ไม่ได้
+#   python bench/bench_metrics.py --repeat 5 --json bench_metrics.json
+
+ROUNDS = 50
+SAMPLE = ("1.) จุดเด่นของสินค้า\n- หอม\n- นุ่ม\n- ถูก\n\n2.) แคปชั่นทำเงิน\nผิวใสใน 7 วัน ✨\n\n"
+          "3.) Hashtag แนะนำ\n#สบู่ #ผิวใส #ของดีบอกต่อ\n\n4.) คำแนะนำเพิ่มเติม\n1. ถ่ายคลิปรีวิว\n2. ทำโปร 1 แถม 1\n")
+
+
+def paired_us(off, on, n):
+    # คืน {'off', 'on', 'off_again'} = µs ต่อครั้งของก้อนที่เร็วที่สุด; สลับลำดับทุกรอบกันได้เปรียบจากการมาก่อน
+    import metrics
+    block = max(1, n // ROUNDS)
+    arms = [('off', off, False), ('on', on, True), ('off_again', off, False)]
+    best = dict.fromkeys((name for name, _, _ in arms), float('inf'))
+    for r in range(ROUNDS):
+        for name, fn, enabled in arms[r % 3:] + arms[:r % 3]:
+            metrics.ENABLED = enabled
+            t0 = time.perf_counter()
+            for i in range(block):
+                fn(i)
+            best[name] = min(best[name], (time.perf_counter() - t0) / block * 1e6)
+    metrics.ENABLED = True
+    return {name: round(us, 3) for name, us in best.items()}
+
+
+def measure(n):
+    # รันด้วย METRICS=1 เสมอ — @timed ต้องห่อไว้ตั้งแต่ import ฝั่งปิดถึงเรียก __wrapped__ ได้
+    from io import BytesIO
+    from PIL import Image
+    import logo_compose
+    import metrics
+    import page_extract
+    import usage_stats
+    from krobjang_core import parse_response
+
+    usage_stats.incr = lambda *names: None   # เหลือแต่งาน CPU ในลูปที่วัด
+    with open(os.path.join(ROOT, 'bench', 'fixtures', 'shopee.html'), 'rb') as fh:
+        html = fh.read()
+    chunks = [html[i:i + page_extract.CHUNK_SIZE] for i in range(0, len(html), page_extract.CHUNK_SIZE)]
+    buf = BytesIO()
+    Image.new('RGBA', (300, 300), (200, 30, 30, 255)).save(buf, format='PNG')
+    logo = buf.getvalue()
+    preview = Image.new('RGB', (512, 512), (240, 240, 240))
+
+    def empty(i):
+        with metrics.span('bench_empty'):
+            pass
+
+    def krobjang(parse):
+        def request(i):
+            with metrics.span('extract'):
+                page_extract.extract_chunks(iter(chunks), 'utf-8')
+            parse(SAMPLE)
+        return request
+
+    def studio(transform, encode):
+        def request(i):
+            transform(logo, 100 + i % 50, i % 360)
+            encode(preview)
+        return request
+
+    return {'empty_span_us': paired_us(empty, empty, n),
+            'krobjang_request_us': paired_us(krobjang(parse_response.__wrapped__), krobjang(parse_response),
+                                             max(1, n // 500)),
+            'studio_request_us': paired_us(studio(logo_compose.transform_logo.__wrapped__,
+                                                  logo_compose.encode_png.__wrapped__),
+                                           studio(logo_compose.transform_logo, logo_compose.encode_png),
+                                           max(1, n // 500))}
+
+
+MEASURES = ('empty_span_us', 'krobjang_request_us', 'studio_request_us')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5, help='จำนวนรอบปิด/เปิด metrics')
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.n)))
+        return
+
+    runs = []
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_metrics_'), 'bench.db')   # กันพลาดไปเขียน merchant_data.db
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, __file__, '--child', '--n', str(args.n)], capture_output=True,
+                             text=True, check=True, env={**os.environ, 'METRICS': '1', 'MERCHANT_DB': db_path})
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    results = {mode: {'enabled': arm == 'on',
+                      **{k: round(statistics.median(r[k][arm] for r in runs), 3) for k in MEASURES}}
+               for mode, arm in (('disabled', 'off'), ('enabled', 'on'))}
+    results['repeat'] = args.repeat
+    for stage in ('krobjang_request_us', 'studio_request_us'):
+        name = stage[:-len('_us')]
+        results[f'{name}_overhead_pct'] = round(statistics.median(
+            (r[stage]['on'] / r[stage]['off'] - 1) * 100 for r in runs), 2)
+        results[f'{name}_noise_pct'] = round(statistics.median(
+            abs(r[stage]['off_again'] / r[stage]['off'] - 1) * 100 for r in runs), 2)
+    for k, v in results.items():
+        print(f"{k:28} {v}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'metrics', **results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# วัดดัชนี near-duplicate: สร้าง signature N ชิ้น (ค่าเริ่มต้น 100k) แล้ววัด latency ของ lookup
+# ด้วยหน้าสินค้าที่ถูกแก้เล็กน้อย (คนละร้าน/ราคา/คำ) และหน้าที่ไม่เกี่ยวกัน — รายงาน recall และ false positive
+#   python bench/bench_near_dup.py --items 100000 --json bench_near_dup.json
+
+WORDS = ['สบู่', 'ครีม', 'เซรั่ม', 'น้ำหอม', 'กันแดด', 'โลชั่น', 'แชมพู', 'ลิปสติก', 'มาส์ก', 'โทนเนอร์',
+         'สมุนไพร', 'ขมิ้น', 'ว่านหางจระเข้', 'วิตามินซี', 'คอลลาเจน', 'ไฮยาลูรอน', 'ถ่านไม้ไผ่', 'มะหาด',
+         'ผิวใส', 'ลดสิว', 'ชุ่มชื้น', 'ออร์แกนิก', 'สูตรอ่อนโยน', 'ขนาดพกพา', 'แพ็คคู่', 'ของแท้', 'ส่งไว',
+         'ลดรอยดำ', 'กระจ่างใส', 'ไม่เหนียว', 'ซึมไว', 'ผิวแพ้ง่าย', 'ปลอดภัย', 'มีอย', 'ขายดี', 'รีวิวเยอะ',
+         'หอมติดทน', 'เนื้อบางเบา', 'คุมมัน', 'กันน้ำ', 'ฟองนุ่ม', 'ล้างออกง่าย', 'บำรุงล้ำลึก', 'ลดริ้วรอย']
+SHOPS = ['ร้านสวยใส', 'BeautyHub', 'ช้อปดี', 'Skin Lab', 'ของดีบอกต่อ', 'Official Store', 'แม่ค้าออนไลน์']
+# คำไทยสุ่มจากพยัญชนะ+สระ ให้คำศัพท์หลากหลายเหมือนรายละเอียดสินค้าจริง (ไม่ใช่แค่ 40 คำวนซ้ำ)
+CONSONANTS = 'กขคงจชซดตทนบปพฟมยรลวสหอฮ'
+VOWELS = ['า', 'ิ', 'ี', 'ุ', 'ู', 'ำ', 'ั', 'ึ', 'ื', '']
+
+
+def vocabulary(n=4000, seed=7):
+    rnd = random.Random(seed)
+    return WORDS + [''.join(rnd.choice(CONSONANTS) + rnd.choice(VOWELS) for _ in range(rnd.randint(2, 4)))
+                    for _ in range(n)]
+
+
+VOCAB = vocabulary()
+
+
+def page_text(rnd):
+    name = ' '.join(rnd.sample(WORDS, 4))
+    detail = ' '.join(rnd.choice(VOCAB) for _ in range(150))
+    return (f"ชื่อสินค้า: {name} {rnd.randint(30, 500)}ml\nแบรนด์: {rnd.choice(SHOPS)}\n"
+            f"ราคา: {rnd.randint(29, 2990)} บาท\nรายละเอียด: {detail}")
+
+
+def variant(text, rnd):
+    # ของชิ้นเดียวกันคนละลิงก์: เปลี่ยนร้าน ราคา และแก้คำในรายละเอียด 2-3 คำ
+    lines = text.split('\n')
+    lines[1] = f"แบรนด์: {rnd.choice(SHOPS)}"
+    lines[2] = f"ราคา: {rnd.randint(29, 2990)} บาท"
+    words = lines[3].split(' ')
+    for _ in range(rnd.randint(2, 3)):
+        words[rnd.randrange(1, len(words))] = rnd.choice(VOCAB)
+    lines[3] = ' '.join(words)
+    return '\n'.join(lines)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {'p50_ms': round(statistics.median(samples), 4),
+            'p99_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args()
+
+    os.environ['MERCHANT_DB'] = os.path.join(tempfile.mkdtemp(prefix='bench_near_dup_'), 'bench.db')
+    import db
+    import near_dup
+    db.DB_PATH = os.environ['MERCHANT_DB']
+
+    rnd = random.Random(1)
+    texts = [page_text(rnd) for _ in range(args.items)]
+    t0 = time.perf_counter()
+    sigs = [near_dup.signature(t) for t in texts]
+    sig_ms = (time.perf_counter() - t0) * 1000 / len(texts)
+    print(f"signature: {sig_ms:.3f} ms/หน้า")
+
+    index = near_dup.NearDupIndex()
+    t0 = time.perf_counter()
+    index.add_many(range(len(sigs)), sigs)
+    build_s = time.perf_counter() - t0
+    print(f"build {len(index):,} รายการ: {build_s:.2f}s")
+
+    def run(queries, expect):
+        samples, hits = [], 0
+        for sig, target in queries:
+            t0 = time.perf_counter()
+            hit = index.lookup(sig)
+            samples.append((time.perf_counter() - t0) * 1000)
+            hits += bool(hit) and (expect is False or hit[0] == target)
+        return samples, hits / len(queries)
+
+    picks = [rnd.randrange(args.items) for _ in range(args.queries)]
+    dup_samples, recall = run([(near_dup.signature(variant(texts[i], rnd)), i) for i in picks], True)
+    new_samples, false_pos = run([(near_dup.signature(page_text(rnd)), None) for _ in range(args.queries)], False)
+
+    # ปลายทางจริง: signature + ดัชนี + อ่านผลจาก SQLite (ใส่ 1,000 แถวแรกลงฐานข้อมูล)
+    for i in range(min(1000, args.items)):
+        near_dup.add(f"https://shopee.co.th/p-i.{i}.1", 'bench', texts[i], {'caption': str(i)})
+    e2e = []
+    for i in picks[:200]:
+        query = variant(texts[i % 1000], rnd)
+        t0 = time.perf_counter()
+        near_dup.find_similar(query, 'bench')
+        e2e.append((time.perf_counter() - t0) * 1000)
+
+    results = {
+        'lookup_near_dup': {**percentiles(dup_samples), 'recall': round(recall, 4)},
+        'lookup_unrelated': {**percentiles(new_samples), 'false_positive_rate': round(false_pos, 4)},
+        'find_similar_end_to_end': percentiles(e2e),
+    }
+    for name, r in results.items():
+        extra = '  '.join(f"{k}={v}" for k, v in r.items() if not k.endswith('_ms'))
+        print(f"{name:24} p50={r['p50_ms']:.4f}ms  p99={r['p99_ms']:.4f}ms  {extra}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'near_dup', 'items': len(index), 'signature_ms': round(sig_ms, 4),
+                       'build_s': round(build_s, 2), 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
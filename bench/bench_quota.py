@@ -0,0 +1,113 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# โหลดเทสต์ quota: หลาย process (แทน worker ของ Streamlit) × หลาย thread (แทน session) ยิง quota.take พร้อมกัน
+# ทุก session สุ่มว่าเป็น IP ไหน (หลาย session ใช้ IP เดียวกันได้ เหมือนเปิดหลายแท็บ/รีเฟรช) หรือเป็น License Pro
+# ตรวจว่าแต่ละ IP/License ได้ไม่เกินที่ถังอนุญาตจริง และวัด latency ของการเช็ก
+#   python bench/bench_quota.py --processes 4 --sessions 32 --seconds 5 --json bench_quota.json
+
+
+def worker(db_path, sessions, seconds, clients, licenses, seed):
+    os.environ['MERCHANT_DB'] = db_path
+    import db
+    import quota
+    db.DB_PATH = db_path
+    latencies, granted, lock = [], Counter(), threading.Lock()
+    deadline = time.time() + seconds
+
+    def session(i):
+        rnd = random.Random(seed * 1000 + i)
+        license_hash = quota.hash_key(rnd.choice(licenses)) if rnd.random() < 0.25 else None
+        client = quota.client_key(rnd.choice(clients))
+        mine, samples = Counter(), []
+        while time.time() < deadline:
+            t0 = time.perf_counter()
+            ok, _, _ = quota.take(quota.buckets(client, license_hash))
+            samples.append((time.perf_counter() - t0) * 1000)
+            if ok:
+                mine[f"pro:{license_hash[:16]}" if license_hash else f"free:{client}"] += 1
+            time.sleep(rnd.uniform(0, 0.005))   # เวลาคิดของผู้ใช้จำลอง
+        with lock:
+            latencies.extend(samples)
+            granted.update(mine)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, dict(granted)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--sessions', type=int, default=32, help='session ต่อ process')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--clients', type=int, default=50, help='จำนวน IP ที่ต่างกัน')
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_quota_'), 'bench.db')
+    import quota
+    clients = [f"10.0.{i // 250}.{i % 250}" for i in range(args.clients)]
+    licenses = [f"KROB-{i:04d}-BENCH" for i in range(5)]
+
+    t0 = time.time()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.starmap(worker, [(db_path, args.sessions, args.seconds, clients, licenses, p)
+                                        for p in range(args.processes)])
+    elapsed = time.time() - t0
+
+    latencies, granted = [], Counter()
+    for lat, g in results:
+        latencies.extend(lat)
+        granted.update(g)
+    latencies.sort()
+
+    # ขอบบนที่ถังอนุญาต: ความจุ + ที่เติมระหว่างเทสต์ (ปัดขึ้น)
+    limits = {'free': quota.FREE_LIMIT + math.ceil(elapsed * quota.FREE_LIMIT / quota.FREE_WINDOW),
+              'pro': quota.PRO_BURST + math.ceil(elapsed * quota.PRO_PER_MINUTE / 60)}
+    over = {k: v for k, v in granted.items() if v > limits[k.split(':')[0]]}
+
+    # เช็ก License: ชุด hash คำนวณครั้งเดียว แล้วแต่ละครั้งเป็นแค่ sha256 + lookup ใน set
+    os.environ['LICENSE_KEYS'] = ','.join(f"KROB-{i:06d}" for i in range(10000))
+    quota.verify_license('warm-up')
+    t1 = time.perf_counter()
+    for i in range(10000):
+        quota.verify_license(f"KROB-{i * 7:06d}")
+    license_us = (time.perf_counter() - t1) / 10000 * 1e6
+
+    summary = {
+        'benchmark': 'quota', 'processes': args.processes, 'sessions': args.processes * args.sessions,
+        'seconds': round(elapsed, 2), 'checks': len(latencies),
+        'checks_per_s': round(len(latencies) / elapsed),
+        'take_p50_ms': round(statistics.median(latencies), 3),
+        'take_p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        'buckets_hit': len(granted), 'granted': sum(granted.values()), 'limits': limits,
+        'over_limit': over, 'license_check_us': round(license_us, 2),
+    }
+    for k, v in summary.items():
+        print(f"{k:16} {v}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(summary, fh, indent=2)
+    if over:
+        sys.exit("มีถังที่ให้เกินขีดจำกัด")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ใส่สินค้าจำลอง N แถว (ค่าเริ่มต้น 1 ล้าน) ลงไฟล์ SQLite ชั่วคราว แล้ววัด latency ของ
+# lookup ตามลิงก์, หน้าแบบ keyset ตามหมวด/ราคา และค้นหา FTS
+#   python bench/bench_store.py --rows 1000000 --json bench_store.json
+
+WORDS = ['สบู่', 'ครีม', 'เซรั่ม', 'น้ำหอม', 'กันแดด', 'โลชั่น', 'แชมพู', 'ลิปสติก', 'มาส์ก', 'โทนเนอร์',
+         'สมุนไพร', 'ขมิ้น', 'ว่านหางจระเข้', 'วิตามินซี', 'คอลลาเจน', 'ไฮยาลูรอน', 'ถ่านไม้ไผ่', 'มะหาด',
+         'ผิวใส', 'ลดสิว', 'ชุ่มชื้น', 'ออร์แกนิก', 'สูตรอ่อนโยน', 'ขนาดพกพา', 'แพ็คคู่', 'ของแท้']
+PLATFORMS = [('Shopee', 'https://shopee.co.th/p-i.{}.{}'), ('Lazada', 'https://www.lazada.co.th/products/p-i{}-s{}.html'),
+             ('TikTok', 'https://www.tiktok.com/view/product/{}{}')]
+CATEGORIES = ['ความงาม', 'ของใช้ในบ้าน', 'อาหารเสริม', 'แม่และเด็ก']
+
+
+def fake_rows(n, seed=1):
+    rnd = random.Random(seed)
+    for i in range(n):
+        platform, pattern = PLATFORMS[i % 3]
+        name = ' '.join(rnd.sample(WORDS, 4)) + f' {rnd.randint(30, 500)}ml'
+        yield {'name': name, 'price': round(rnd.uniform(29, 2990), 2), 'platform': platform,
+               'category': CATEGORIES[i % len(CATEGORIES)],
+               'link': pattern.format(i, rnd.randint(1, 99999)) + '?utm_source=bench',
+               'caption': f"{name} ของมันต้องมี 🔥"}
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {'p50_ms': round(statistics.median(samples), 3),
+            'p99_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+            'runs': runs}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=500)
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_store_')
+    os.environ['MERCHANT_DB'] = os.path.join(tmp, 'bench.db')
+    import db
+    import product_store
+    db.DB_PATH = os.environ['MERCHANT_DB']
+
+    t0 = time.perf_counter()
+    inserted = product_store.upsert_products(fake_rows(args.rows))
+    insert_s = time.perf_counter() - t0
+    print(f"insert {inserted:,} แถว: {insert_s:.1f}s ({inserted / insert_s:,.0f} แถว/วินาที)")
+
+    rnd = random.Random(2)
+    sample = list(fake_rows(min(args.rows, 20000)))
+    results = {
+        'lookup_by_link': timed(lambda: product_store.get_by_link(rnd.choice(sample)['link']), args.runs),
+        'page_category_price': timed(lambda: product_store.page(rnd.randrange(args.rows), 50, 'ความงาม',
+                                                                min_price=100, max_price=1000), args.runs),
+        'search_fts': timed(lambda: product_store.search(rnd.choice(WORDS[10:]), 20), min(args.runs, 200)),
+        'search_fts_filtered': timed(lambda: product_store.search(rnd.choice(WORDS[10:]), 20, platform='Shopee'),
+                                     min(args.runs, 200)),
+    }
+    for name, r in results.items():
+        print(f"{name:22} p50={r['p50_ms']:.3f}ms  p99={r['p99_ms']:.3f}ms")
+
+    size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1024 / 1024
+    print(f"ขนาดไฟล์ (รวม WAL): {size_mb:.0f} MB  ที่ {tmp}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'store', 'rows': inserted, 'insert_rows_per_s': round(inserted / insert_s),
+                       'db_mb': round(size_mb, 1), 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
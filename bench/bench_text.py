@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# micro-benchmark ของ hot path ข้อความ: แปลชื่อสินค้า (create_pro_prompt) และแยกส่วนคำตอบ (parse_result)
+# เทียบแบบเดิม (loop replace / 4 regex) กับแบบใหม่ (translator รอบเดียว / SectionStream รอบเดียว)
+#   python bench/bench_text.py --items 20000 --json bench_text.json
+
+WORDS = ['สบู่', 'ครีม', 'เซรั่ม', 'น้ำหอม', 'ครีมกันแดด', 'โลชั่น', 'แชมพู', 'ลิปสติก', 'มาส์กหน้า', 'โทนเนอร์',
+         'สมุนไพร', 'ขมิ้น', 'ว่านหางจระเข้', 'วิตามินซี', 'คอลลาเจน', 'ไฮยาลูรอน', 'ถ่านไม้ไผ่', 'มะหาด',
+         'ผิวใส', 'ลดสิว', 'ชุ่มชื้น', 'ออร์แกนิก', 'สูตรอ่อนโยน', 'ขนาดพกพา', 'แพ็คคู่', 'ของแท้', 'กล่อง']
+
+# หัวข้อแบบต่างๆ ที่ Gemini ตอบกลับมาจริง
+HEADER_STYLES = [
+    ['1.) จุดเด่นของสินค้า', '2.) แคปชั่นทำเงิน', '3.) Hashtag แนะนำ', '4.) คำแนะนำเพิ่มเติม'],
+    ['1. จุดเด่นของสินค้า', '2. แคปชั่นทำเงิน', '3. Hashtag แนะนำ', '4. คำแนะนำเพิ่มเติม'],
+    ['**1.) จุดเด่นของสินค้า**', '**2.) แคปชั่นทำเงิน**', '**3.) Hashtag แนะนำ**', '**4.) คำแนะนำเพิ่มเติม**'],
+    ['### 1) จุดเด่นของสินค้า', '### 2) แคปชั่นทำเงิน', '### 3) Hashtag แนะนำ', '### 4) คำแนะนำเพิ่มเติม'],
+]
+
+
+def product_names(n, seed=1):
+    rnd = random.Random(seed)
+    return [''.join(rnd.sample(WORDS, rnd.randint(2, 5))) + f' {rnd.randint(30, 500)}ml' for _ in range(n)]
+
+
+def responses(n, seed=2):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        h = rnd.choice(HEADER_STYLES)
+        points = '\n'.join(f'- {" ".join(rnd.sample(WORDS, 6))}' for _ in range(3))
+        tags = '\n'.join('#' + w for w in rnd.sample(WORDS, 7))
+        tips = '\n'.join(f'{i}. {" ".join(rnd.sample(WORDS, 8))}' for i in (1, 2))
+        out.append(f"แน่นอนค่ะ นี่คือผลวิเคราะห์\n\n{h[0]}\n{points}\n\n{h[1]}\n✨ {' '.join(rnd.sample(WORDS, 10))} 🔥\n\n"
+                   f"{h[2]}\n{tags}\n\n{h[3]}\n{tips}\n")
+    return out
+
+
+def legacy_translate(product_input, local_dict):
+    product_eng = product_input
+    for thai, eng in local_dict.items():
+        if thai in product_eng: product_eng = product_eng.replace(thai, eng)
+    return product_eng, product_eng.lower()
+
+
+def legacy_parse(text):
+    result = {'points': '', 'caption': '', 'hashtags': '', 'tips': ''}
+    points_match = re.search(r'1[.)]\s*จุดเด่น[^\n]*\n([\s\S]*?)(?=\n2[.)]|\Z)', text)
+    caption_match = re.search(r'2[.)]\s*แคปชั่น[^\n]*\n([\s\S]*?)(?=\n3[.)]|\Z)', text)
+    hashtag_match = re.search(r'3[.)]\s*Hashtag[^\n]*\n([\s\S]*?)(?=\n4[.)]|\Z)', text)
+    tips_match = re.search(r'4[.)]\s*คำแนะนำ[^\n]*\n([\s\S]*?)(?=\n5[.)]|\Z)', text)
+    if points_match: result['points'] = points_match.group(1).strip()
+    if caption_match: result['caption'] = caption_match.group(1).strip()
+    if hashtag_match: result['hashtags'] = hashtag_match.group(1).strip().replace('\n', ' ')
+    if tips_match: result['tips'] = tips_match.group(1).strip()
+    return result
+
+
+def throughput(fn, items, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - t0)
+    return round(len(items) / best)
+
+
+def found_rate(parse, texts):
+    return round(sum(sum(1 for v in parse(t).values() if v) for t in texts) / (len(texts) * 4), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args()
+
+    from krobjang_core import parse_result
+    from studio_core import LOCAL_DICT
+    from translator import get_translator, load_vocab
+
+    names = product_names(args.items)
+    texts = responses(max(1, args.items // 10))
+    translator = get_translator(LOCAL_DICT)
+    # แบบเดิมกับคำศัพท์ชุดเต็ม — ให้เทียบกันที่ขนาดพจนานุกรมเท่ากัน
+    full_dict = {**LOCAL_DICT, **load_vocab()}
+
+    results = {
+        'translate_legacy_small_dict': {'ops_per_s': throughput(lambda x: legacy_translate(x, LOCAL_DICT), names,
+                                                                args.repeat), 'dict_size': len(LOCAL_DICT)},
+        'translate_legacy_full_dict': {'ops_per_s': throughput(lambda x: legacy_translate(x, full_dict), names,
+                                                               args.repeat), 'dict_size': len(full_dict)},
+        'translate_compiled': {'ops_per_s': throughput(lambda x: translator.translate(x).lower(), names, args.repeat),
+                               'dict_size': len(translator.mapping)},
+        'parse_legacy': {'ops_per_s': throughput(legacy_parse, texts, args.repeat),
+                         'sections_found': found_rate(legacy_parse, texts)},
+        'parse_single_pass': {'ops_per_s': throughput(parse_result, texts, args.repeat),
+                              'sections_found': found_rate(parse_result, texts)},
+    }
+    for name, r in results.items():
+        extra = '  '.join(f"{k}={v}" for k, v in r.items() if k != 'ops_per_s')
+        print(f"{name:28} {r['ops_per_s']:>10,} ops/s  {extra}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'text', 'items': len(names), 'responses': len(texts), 'results': results},
+                      fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+# แทน google.generativeai.GenerativeModel ตอน benchmark — ตอบผลวิเคราะห์สำเร็จรูปด้วยความหน่วงต่อ token ที่ตั้งได้
+#   model = FakeGenerativeModel(first_token_latency=0.4, token_latency=0.01)
+#   install(token_latency=0.01)   -> gemini_client.get_model คืนโมเดลปลอม (ทั้ง krobjang.py, krobjang_bulk, worker)
+# ขอแบบ JSON (generation_config มี response_mime_type) ได้ JSON ตาม RESPONSE_SCHEMA ไม่งั้นได้ข้อความแบบหัวข้อ 1.)-4.)
+
+CHARS_PER_TOKEN = 3         # ภาษาไทยประมาณ 2-4 ตัวอักษรต่อ token
+CHUNK_TOKENS = 16           # Gemini ส่ง stream มาเป็นก้อนละหลาย token
+
+TEXT_RESPONSE = """1.) จุดเด่นของสินค้า
+- สูตรอ่อนโยน ใช้ได้ทุกสภาพผิว ไม่มีพาราเบน
+- เนื้อบางเบา ซึมไว ไม่เหนอะหนะ
+- ผลิตในไทย ได้มาตรฐาน อย.
+
+2.) แคปชั่นทำเงิน
+ผิวใสขึ้นจริงใน 7 วัน ✨ ตัวดังใน TikTok ราคานี้ต้องรีบตำ 🔥
+
+3.) Hashtag แนะนำ
+#ของดีบอกต่อ #รีวิวบิวตี้ #ผิวใส #tiktokshop #ป้ายยา #ของมันต้องมี #สกินแคร์
+
+4.) คำแนะนำเพิ่มเติม
+1. ถ่ายคลิปก่อน/หลังใช้ 7 วัน ให้เห็นผลชัด
+2. โพสต์ช่วง 19:00-21:00 คนดูเยอะสุด
+"""
+
+JSON_RESPONSE = json.dumps({
+    'points': ['สูตรอ่อนโยน ใช้ได้ทุกสภาพผิว ไม่มีพาราเบน', 'เนื้อบางเบา ซึมไว ไม่เหนอะหนะ', 'ผลิตในไทย ได้มาตรฐาน อย.'],
+    'caption': 'ผิวใสขึ้นจริงใน 7 วัน ✨ ตัวดังใน TikTok ราคานี้ต้องรีบตำ 🔥',
+    'hashtags': ['#ของดีบอกต่อ', '#รีวิวบิวตี้', '#ผิวใส', '#tiktokshop', '#ป้ายยา', '#ของมันต้องมี', '#สกินแคร์'],
+    'tips': ['ถ่ายคลิปก่อน/หลังใช้ 7 วัน ให้เห็นผลชัด', 'โพสต์ช่วง 19:00-21:00 คนดูเยอะสุด'],
+}, ensure_ascii=False, indent=1)
+
+
+class FakeResponse:
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name='fake-gemini', first_token_latency=0.3, token_latency=0.005,
+                 chunk_tokens=CHUNK_TOKENS, fail_every=0):
+        self.model_name = model_name
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.chunk_tokens = chunk_tokens
+        self.fail_every = fail_every        # >0: ทุกครั้งที่ n ยก exception (ลองระบบ retry)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _response_text(self, generation_config):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.fail_every and calls % self.fail_every == 0:
+            raise RuntimeError("429 Resource has been exhausted (fake)")
+        config = generation_config or {}
+        return JSON_RESPONSE if config.get('response_mime_type') == 'application/json' else TEXT_RESPONSE
+
+    def _chunks(self, text):
+        size = self.chunk_tokens * CHARS_PER_TOKEN
+        time.sleep(self.first_token_latency)
+        for i in range(0, len(text), size):
+            piece = text[i:i + size]
+            time.sleep(self.token_latency * len(piece) / CHARS_PER_TOKEN)
+            yield FakeResponse(piece)
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        text = self._response_text(generation_config)
+        if stream:
+            return self._chunks(text)
+        time.sleep(self.first_token_latency + self.token_latency * len(text) / CHARS_PER_TOKEN)
+        return FakeResponse(text)
+
+
+def install(**kwargs):
+    # ให้ทุกที่ที่เรียก gemini_client.get_model ได้โมเดลปลอมตัวเดียวกัน (ทุก API key)
+    import gemini_client
+    model = FakeGenerativeModel(**kwargs)
+    gemini_client.get_model = lambda api_key, model_name=None: model
+    return model
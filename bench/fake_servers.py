@@ -0,0 +1,160 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+# เซิร์ฟเวอร์ปลอมสำหรับทดสอบ/benchmark โดยไม่ต้องยิงบริการจริง
+#   python bench/fake_servers.py images --port 8765 --latency 0.5
+#   POLLINATIONS_BASE=http://127.0.0.1:8765 streamlit run app.py
+#   python bench/fake_servers.py pages --port 8766 --latency 0.3
+#   แล้ววางลิงก์ http://127.0.0.1:8766/shopee.co.th/p-i.1.2 ในหน้า Krobjang (detect_platform ดูจากชื่อโดเมนในลิงก์)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PLATFORMS = ('shopee', 'lazada', 'tiktok')
+
+_png_cache = {}
+_png_lock = threading.Lock()
+
+
+def fake_png(size, seed):
+    # ภาพสีพื้นตาม seed (มี noise เล็กน้อยให้ขนาดไฟล์ใกล้ภาพจริง) — cache ไว้ต่อ (size, seed)
+    key = (size, seed)
+    with _png_lock:
+        if key in _png_cache:
+            return _png_cache[key]
+    from PIL import Image
+    rnd = random.Random(seed)
+    img = Image.new('RGB', (size, size), (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+    img.paste(Image.effect_noise((size // 16, size // 16), 40).convert('RGB').resize((size, size), Image.BILINEAR), (0, 0),
+              Image.new('L', (size, size), 60))
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    with _png_lock:
+        if len(_png_cache) > 64:
+            _png_cache.clear()
+        _png_cache[key] = buf.getvalue()
+    return _png_cache[key]
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    # เลียนแบบ image.pollinations.ai/prompt/<prompt>?width=&height=&seed=
+    latency = 0.0
+    requests_served = 0
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        if not parts.path.startswith('/prompt/'):
+            self.send_error(404)
+            return
+        query = urllib.parse.parse_qs(parts.query)
+        size = int(query.get('width', ['1024'])[0])
+        seed = int(query.get('seed', ['0'])[0])
+        if self.latency:
+            time.sleep(self.latency)
+        body = fake_png(size, seed)
+        type(self).requests_served += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', f'"{size}-{seed}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_fixtures = {}
+_CONSONANTS = 'กขคงจฉชซดตถทนบปผพฟมยรลวสหอฮ'
+_VOWELS = ['า', 'ิ', 'ี', 'ุ', 'ู', 'ะ', 'ำ', 'ั', 'เ', 'แ', 'โ', 'ไ']
+
+
+def fixture(platform):
+    if platform not in _fixtures:
+        with open(os.path.join(FIXTURES, f'{platform}.html'), 'rb') as fh:
+            _fixtures[platform] = fh.read()
+    return _fixtures[platform]
+
+
+def product_blurb(seed, words=300):
+    # รายละเอียดสินค้าสุ่มตาม seed — ลิงก์ต่างกันได้เนื้อหาต่างกันพอที่ near_dup จะไม่ถือว่าเป็นสินค้าเดียวกัน
+    rnd = random.Random(seed)
+    return ' '.join(''.join(rnd.choice(_CONSONANTS) + rnd.choice(_VOWELS) for _ in range(rnd.randint(1, 3)))
+                    for _ in range(words))
+
+
+def product_page(path, vary=True):
+    # เลือก fixture จากชื่อแพลตฟอร์มใน path; vary=True แทรกรายละเอียดเฉพาะของลิงก์นั้นไว้ต้น <body>
+    platform = next((p for p in PLATFORMS if p in path), None)
+    if platform is None:
+        return None
+    html = fixture(platform)
+    if vary:
+        at = html.index(b'>', html.index(b'<body')) + 1
+        blurb = product_blurb(zlib.crc32(path.encode('utf-8'))).encode('utf-8')
+        html = html[:at] + b'<p>' + blurb + b'</p>' + html[at:]
+    return html
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    # หน้าสินค้า TikTok/Shopee/Lazada จาก bench/fixtures เช่น /shopee.co.th/p-i.1.2
+    latency = 0.0
+    vary = True
+    requests_served = 0
+
+    def do_GET(self):
+        body = product_page(urllib.parse.urlsplit(self.path).path, self.vary)
+        if body is None:
+            self.send_error(404)
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        type(self).requests_served += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def page_url(base, platform, item):
+    # ลิงก์ที่ detect_platform รู้จัก (มีชื่อโดเมนจริงอยู่ใน path)
+    return {'shopee': f'{base}/shopee.co.th/p-i.{item}.1', 'lazada': f'{base}/lazada.co.th/products/p-i{item}-s1.html',
+            'tiktok': f'{base}/tiktok.com/view/product/{item}'}[platform]
+
+
+def start(handler, port=0, **attrs):
+    # เปิดเซิร์ฟเวอร์ใน thread เบื้องหลัง คืน (server, base_url) — ใช้ server.shutdown() เพื่อปิด
+    handler = type(handler.__name__, (handler,), attrs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('kind', choices=['images', 'pages'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='วินาทีต่อ request')
+    args = parser.parse_args()
+    handler = {'images': ImageHandler, 'pages': PageHandler}[args.kind]
+    server, url = start(handler, args.port, latency=args.latency)
+    print(f'{args.kind} server: {url}', file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.join(ROOT, 'bench')
+
+# รัน benchmark ทุกตัว (process ละตัว) แล้วรวมผลเป็น JSON ไฟล์เดียว พร้อม git rev/เครื่องที่รัน — เก็บไว้เทียบข้าม commit
+#   python bench/run_all.py --quick --out bench_results.json
+#   python bench/run_all.py --baseline bench_results_main.json --out bench_results.json   -> พิมพ์ตัวที่ช้าลง/เร็วขึ้น
+# ตัวเลขเทียบกันได้เฉพาะเครื่องเดียวกัน (ดู machine ในไฟล์ผล)
+
+# ชื่อ -> (สคริปต์, argument แบบเต็ม, argument แบบ --quick)
+SUITES = {
+    'text': ('bench_text.py', [], ['--items', '5000']),
+    'hotpaths': ('bench_hotpaths.py', [], ['--runs', '50']),
+    'extract': ('bench_extract.py', [], ['--pad-mb', '1', '--repeat', '3']),
+    'near_dup': ('bench_near_dup.py', [], ['--items', '20000', '--queries', '500']),
+    'store': ('bench_store.py', [], ['--rows', '100000', '--runs', '200']),
+    'quota': ('bench_quota.py', [], ['--seconds', '2']),
+    'metrics': ('bench_metrics.py', [], ['--n', '50000', '--repeat', '3']),
+    'startup': ('bench_startup.py', [], ['--reruns', '5', '--repeat', '1']),
+    'e2e': ('bench_e2e.py', [], ['--concurrency', '1,4', '--sessions', '8']),
+}
+THRESHOLD = 0.10    # เปลี่ยนเกิน 10% ถึงจะรายงาน
+
+
+def git_info():
+    def git(*cmd):
+        try:
+            return subprocess.run(['git', *cmd], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            return ''
+    return {'rev': git('rev-parse', 'HEAD'), 'subject': git('log', '-1', '--format=%s'),
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'node': platform.node()}
+
+
+def run_suite(name, quick, timeout):
+    script, full_args, quick_args = SUITES[name]
+    fd, out = tempfile.mkstemp(prefix=f'bench_{name}_', suffix='.json')
+    os.close(fd)
+    cmd = [sys.executable, os.path.join(BENCH, script), *(quick_args if quick else full_args), '--json', out]
+    t0 = time.monotonic()
+    try:
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+        error = None if proc.returncode == 0 else proc.stderr.strip().splitlines()[-5:]
+    except subprocess.TimeoutExpired:
+        error = [f'timeout หลัง {timeout} วินาที']
+    elapsed = round(time.monotonic() - t0, 1)
+    try:
+        with open(out) as fh:
+            result = json.load(fh) if not error else None
+    except (OSError, ValueError):
+        result, error = None, error or ['ไม่มีไฟล์ผล JSON']
+    finally:
+        os.unlink(out)
+    return {'args': cmd[2:-2], 'elapsed_s': elapsed, 'error': error, 'result': result}
+
+
+def flatten(value, prefix=''):
+    # {'a': {'p50_ms': 1}} -> {'a.p50_ms': 1} เฉพาะตัวเลข — list ใช้ค่า scenario/concurrency เป็นชื่อถ้ามี
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            out.update(flatten(v, f'{prefix}.{k}' if prefix else str(k)))
+        return out
+    if isinstance(value, list):
+        out = {}
+        for i, v in enumerate(value):
+            label = f"{v.get('scenario', i)}@{v['concurrency']}" if isinstance(v, dict) and 'concurrency' in v else i
+            out.update(flatten(v, f'{prefix}[{label}]'))
+        return out
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def direction(key):
+    # +1 = ยิ่งมากยิ่งดี (throughput), -1 = ยิ่งน้อยยิ่งดี (เวลา), 0 = ไม่ใช่ตัวชี้วัด (ขนาด/จำนวนรอบ)
+    leaf = key.rsplit('.', 1)[-1]
+    if key.startswith('config.'):   # ค่าที่ตั้งตอนรัน ไม่ใช่ผลวัด
+        return 0
+    if 'per_s' in leaf or leaf == 'recall':
+        return 1
+    if leaf.endswith(('_ms', '_us', '_s', '_mb', '_kb')) or leaf in ('errors', 'false_positive_rate'):
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # คืน [(key, ก่อน, หลัง, อัตราส่วน, แย่ลงไหม)] เฉพาะตัวที่เปลี่ยนเกิน threshold
+    changes = []
+    for name, suite in current['benchmarks'].items():
+        before = (baseline.get('benchmarks', {}).get(name) or {}).get('result')
+        if not before or not suite['result']:
+            continue
+        old, new = flatten(before), flatten(suite['result'])
+        for key in sorted(old.keys() & new.keys()):
+            sign = direction(key)
+            if not sign or not old[key]:
+                continue
+            ratio = new[key] / old[key]
+            if abs(ratio - 1) > threshold:
+                changes.append((f'{name}:{key}', old[key], new[key], ratio, (ratio - 1) * sign < 0))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', help='เลือกบางตัว คั่นด้วย , เช่น text,hotpaths (มี: ' + ', '.join(SUITES) + ')')
+    parser.add_argument('--quick', action='store_true', help='ขนาดเล็ก รันจบในไม่กี่นาที')
+    parser.add_argument('--timeout', type=float, default=1800, help='วินาทีต่อ benchmark')
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help='ไฟล์ผลของ commit ก่อนหน้า ไว้เทียบ')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--fail-on-regression', action='store_true', help='มีตัวที่แย่ลง -> exit code 1')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(SUITES)
+    unknown = [n for n in names if n not in SUITES]
+    if unknown:
+        parser.error(f"ไม่รู้จัก: {', '.join(unknown)}")
+
+    report = {'git': git_info(), 'machine': machine_info(), 'quick': args.quick,
+              'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+              'benchmarks': {}}
+    for name in names:
+        print(f"▶ {name} ...", file=sys.stderr, flush=True)
+        suite = report['benchmarks'][name] = run_suite(name, args.quick, args.timeout)
+        status = 'ok' if not suite['error'] else 'ล้มเหลว: ' + ' | '.join(suite['error'])
+        print(f"  {suite['elapsed_s']}s {status}", file=sys.stderr)
+    with open(args.out, 'w') as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+    failed = [n for n, s in report['benchmarks'].items() if s['error']]
+    print(f"บันทึก {args.out} ({len(names) - len(failed)}/{len(names)} ผ่าน)", file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        print(f"เทียบกับ {baseline.get('git', {}).get('rev', '?')[:10]} (เกิน ±{args.threshold:.0%}):", file=sys.stderr)
+        for key, old, new, ratio, worse in compare(baseline, report, args.threshold):
+            print(f"  {'❌ แย่ลง' if worse else '✅ ดีขึ้น'} {key}: {old:g} -> {new:g} (×{ratio:.2f})", file=sys.stderr)
+            if worse:
+                regressions.append(key)
+    if failed or (args.fail_on_regression and regressions):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import contextlib
+import os
+import sqlite3
+import threading
+
+# --- CONFIG ---
+# ฐานข้อมูลกลางของทั้งสองแอป (ตั้ง MERCHANT_DB เพื่อชี้ไปไฟล์อื่นได้)
+DB_PATH = os.environ.get(
+    "MERCHANT_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "merchant_data.db"),
+)
+STATEMENT_CACHE = 256   # prepared statement ที่ sqlite3 เก็บไว้ต่อ connection
+
+_local = threading.local()
+_schemas = set()    # (ไฟล์, schema) ที่สร้างตารางแล้วใน process นี้
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or DB_PATH, timeout=10, cached_statements=STATEMENT_CACHE)
+    # WAL ให้หลาย worker อ่าน/เขียนพร้อมกันได้โดยไม่ล็อกทั้งไฟล์
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def pooled(path=None):
+    # connection เดียวต่อ thread ต่อไฟล์ ใช้ซ้ำไปเรื่อยๆ (statement ที่ prepare แล้วก็ใช้ซ้ำได้)
+    # ผูกกับ pid ด้วย — process ลูกที่ fork มาจะเปิดของตัวเองใหม่
+    path = path or DB_PATH
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.conns = {}
+    conn = _local.conns.get(path)
+    if conn is None:
+        conn = _local.conns[path] = connect(path)
+    return conn
+
+
+def ensure_schema(schema, path=None):
+    # สร้างตารางของโมดูลครั้งเดียวต่อ process ต่อไฟล์ แล้วคืน connection ของ thread นี้
+    # schema = สคริปต์ CREATE ... IF NOT EXISTS หรือฟังก์ชัน (conn) สำหรับ migrate ที่ต้องดูตารางเดิมก่อน
+    path = path or DB_PATH
+    conn = pooled(path)
+    if (path, schema) not in _schemas:
+        with conn:
+            if callable(schema):
+                schema(conn)
+            else:
+                conn.executescript(schema)
+        _schemas.add((path, schema))
+    return conn
+
+
+@contextlib.contextmanager
+def session(path=None, schema=None):
+    # หนึ่ง transaction บน connection ของ thread นี้ — commit เมื่อจบบล็อก, rollback ถ้ามี exception
+    conn = ensure_schema(schema, path) if schema else pooled(path)
+    with conn:
+        yield conn
+
+
+@contextlib.contextmanager
+def immediate(path=None, schema=None):
+    # BEGIN IMMEDIATE: ล็อกเขียนตั้งแต่ต้น อ่าน-คำนวณ-เขียนเป็นก้อนเดียว process อื่นแทรกไม่ได้
+    conn = ensure_schema(schema, path) if schema else pooled(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
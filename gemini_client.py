@@ -0,0 +1,30 @@
+import streamlit as st
+
+# โมเดล Gemini หนึ่งตัวต่อ (API key, ชื่อโมเดล) ต่อ process ใช้ร่วมกันทุก session
+# google.generativeai ใช้เวลา import เกือบ 1 วินาที จึงโหลดตอนต้องใช้โมเดลครั้งแรกเท่านั้น ไม่ใช่ตอนเปิดหน้า
+
+# --- CONFIG ---
+DEFAULT_MODEL = 'gemini-1.5-flash-8b'
+MAX_MODELS = 256        # จำนวน API key ที่เก็บ client ไว้พร้อมกัน
+
+
+def sdk():
+    import google.generativeai as genai
+    return genai
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_MODELS)
+def get_model(api_key, model_name=DEFAULT_MODEL):
+    genai = sdk()
+    model = genai.GenerativeModel(model_name)
+    # client ของคีย์นี้เอง — genai.configure เป็นค่า global ผู้ใช้หลายคนใน process เดียวจะทับคีย์กัน จึงห้ามถอยไปใช้
+    # _ClientManager / model._client เป็น API ภายในของ SDK: requirements.txt ตรึงรุ่นที่ตรวจแล้วไว้ (0.7.2 - 0.8.x)
+    try:
+        from google.generativeai.client import _ClientManager
+        manager = _ClientManager()
+        manager.configure(api_key=api_key)
+        model._client = manager.make_client('generative')
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"google-generativeai {getattr(genai, '__version__', '?')} ไม่รองรับ client แยกต่อ API key "
+                           "— ติดตั้งรุ่นตาม requirements.txt") from e
+    return model
@@ -0,0 +1,136 @@
+import threading
+import urllib.parse
+from collections import OrderedDict
+
+import streamlit as st
+
+import metrics
+
+# HTTP client กลางของทั้งสองแอป: session เดียวต่อ process (เก็บ connection ไว้ใช้ซ้ำ ไม่ต้อง handshake ใหม่ทุกครั้ง)
+# มี timeout เสมอ, retry แบบ backoff + jitter, จำกัด connection ต่อ host และเก็บ latency ต่อ host
+
+# --- CONFIG ---
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 20
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+POOL_HOSTS = 32          # จำนวน host ที่เก็บ pool ไว้
+POOL_PER_HOST = 10       # connection พร้อมกันสูงสุดต่อ host (เกินนี้รอคิว)
+RETRIES = 3
+BACKOFF = 0.5            # วินาที — รอ 0.5, 1, 2 ... + jitter
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_AFTER_MAX = 5      # วินาที — Retry-After ของ server (เช่น 429 ให้รอ 300) รอไม่เกินนี้ต่อรอบ
+CONDITIONAL_MAX_BYTES = 5 * 1024 * 1024         # ต่อไฟล์ — ใหญ่กว่านี้ไม่จำไว้ถามแบบ conditional
+CONDITIONAL_TOTAL_BYTES = 64 * 1024 * 1024      # รวมทั้ง process — เกินแล้วไล่ตัวที่ไม่ได้ใช้นานสุดออก
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+_lock = threading.Lock()
+_latency = {}                       # host -> {'count', 'sum_ms', 'buckets'}
+_validators = OrderedDict()         # url -> (etag, last_modified, content)
+_validators_bytes = 0
+
+
+def _retry():
+    from urllib3.util.retry import Retry
+
+    class CappedRetry(Retry):
+        # urllib3 รอตาม Retry-After เท่าไหร่ก็ได้ — 3 รอบ x 300 วินาทีคือ thread ของ Streamlit ค้าง 15 นาที
+        def get_retry_after(self, response):
+            retry_after = super().get_retry_after(response)
+            return None if retry_after is None else min(retry_after, RETRY_AFTER_MAX)
+
+    kwargs = dict(total=RETRIES, connect=RETRIES, read=RETRIES, status=RETRIES, backoff_factor=BACKOFF,
+                  status_forcelist=RETRY_STATUS, allowed_methods=frozenset({'GET', 'HEAD'}),
+                  respect_retry_after_header=True, raise_on_status=False)
+    try:
+        return CappedRetry(backoff_jitter=BACKOFF, **kwargs)
+    except TypeError:  # urllib3 < 2 ไม่มี jitter
+        return CappedRetry(**kwargs)
+
+
+def _record_latency(response, *args, **kwargs):
+    host = urllib.parse.urlsplit(response.url).netloc
+    ms = response.elapsed.total_seconds() * 1000
+    if metrics.ENABLED:
+        metrics.record('http', ms)
+    with _lock:
+        stats = _latency.setdefault(host, {'count': 0, 'sum_ms': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS_MS)})
+        stats['count'] += 1
+        stats['sum_ms'] += ms
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                stats['buckets'][i] += 1
+                break
+
+
+@st.cache_resource
+def get_session():
+    # requests/urllib3 โหลดตอนสร้าง session ครั้งแรก ไม่ใช่ตอน import โมดูลนี้
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    # pool_block=True: เกิน POOL_PER_HOST แล้วรอ connection ว่าง แทนที่จะเปิดใหม่เรื่อยๆ
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, pool_block=True,
+                          max_retries=_retry())
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(_record_latency)
+    return session
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('timeout', TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def get_content(url, conditional=True, **kwargs):
+    # ดึง bytes ของ url; ถ้าเคยโหลดแล้วและ server ให้ ETag/Last-Modified จะถามแบบ conditional (304 = ใช้ของเดิม)
+    # url ที่ไม่มีทางขอซ้ำ (ภาพ seed สุ่ม — มีแคชดิสก์ของ image_cache อยู่แล้ว) ให้ส่ง conditional=False ไม่ต้องจำ
+    global _validators_bytes
+    headers = dict(kwargs.pop('headers', None) or {})
+    with _lock:
+        cached = _validators.get(url) if conditional else None
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    res = get(url, headers=headers, **kwargs)
+    if cached and res.status_code == 304:
+        with _lock:
+            _validators.move_to_end(url)
+        return cached[2]
+    res.raise_for_status()
+    etag, last_modified = res.headers.get('ETag'), res.headers.get('Last-Modified')
+    if conditional and (etag or last_modified) and len(res.content) <= CONDITIONAL_MAX_BYTES:
+        with _lock:
+            old = _validators.pop(url, None)
+            if old:
+                _validators_bytes -= len(old[2])
+            _validators[url] = (etag, last_modified, res.content)
+            _validators_bytes += len(res.content)
+            while _validators_bytes > CONDITIONAL_TOTAL_BYTES:
+                _validators_bytes -= len(_validators.popitem(last=False)[1][2])
+    return res.content
+
+
+def latency_histograms():
+    # {host: {'count', 'sum_ms', 'buckets': {'<=10ms': n, ...}}} — bucket แบบไม่สะสม
+    with _lock:
+        snapshot = {host: dict(stats, buckets=list(stats['buckets'])) for host, stats in _latency.items()}
+    for stats in snapshot.values():
+        stats['buckets'] = {('<=%gms' % b if b != float('inf') else '>%gms' % LATENCY_BUCKETS_MS[-2]): n
+                            for b, n in zip(LATENCY_BUCKETS_MS, stats['buckets'])}
+    return snapshot
+
+
+def latency_report():
+    lines = []
+    for host, stats in sorted(latency_histograms().items()):
+        avg = stats['sum_ms'] / stats['count'] if stats['count'] else 0
+        buckets = ' '.join(f'{k}:{v}' for k, v in stats['buckets'].items() if v)
+        lines.append(f"{host}  n={stats['count']}  avg={avg:.0f}ms  {buckets}")
+    return '\n'.join(lines)
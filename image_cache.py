@@ -0,0 +1,159 @@
+import hashlib
+import os
+import random
+import threading
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import metrics
+
+# แคชภาพที่สร้างจาก pollinations.ai ลงดิสก์ (key = prompt + seed + model + ขนาด) จำกัดขนาดรวมแบบ LRU
+# และ PrefetchPool ที่สร้างภาพ seed ใหม่รอไว้ล่วงหน้า กด "สร้างฉากใหม่" แล้วได้ภาพทันที
+
+# --- CONFIG ---
+# ชี้ไป stub server ตอนทดสอบได้ เช่น POLLINATIONS_BASE=http://127.0.0.1:8765
+IMAGE_BASE = os.environ.get("POLLINATIONS_BASE", "https://image.pollinations.ai").rstrip("/")
+DEFAULT_MODEL = "flux"
+DEFAULT_SIZE = 1024
+CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".image_cache"))
+CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_MB", "500")) * 1024 * 1024
+CACHE_LOW_WATER = 0.9       # เกินเพดานแล้วลบจนเหลือสัดส่วนนี้ — put ถัดๆ ไปไม่ต้องเดินทั้งโฟลเดอร์ทุกครั้ง
+IMAGE_READ_TIMEOUT = 60     # pollinations ใช้เวลาสร้างภาพนาน
+PREFETCH_PER_PROMPT = 3     # seed ที่เตรียมไว้ต่อ prompt
+PREFETCH_WORKERS = 2
+
+_evict_lock = threading.Lock()
+_cache_bytes = {}   # CACHE_DIR -> ขนาดรวมโดยประมาณ (ตอน evict ล่าสุด + ที่ process นี้เขียนเพิ่ม)
+
+
+def build_image_url(prompt, seed, model=DEFAULT_MODEL, size=DEFAULT_SIZE):
+    encoded = urllib.parse.quote(prompt)
+    return f"{IMAGE_BASE}/prompt/{encoded}?width={size}&height={size}&model={model}&nologo=true&seed={seed}"
+
+
+def cache_key(prompt, seed, model=DEFAULT_MODEL, size=DEFAULT_SIZE):
+    return hashlib.sha256(f"{prompt}|{seed}|{model}|{size}".encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, key[:2], key)
+
+
+def get(key):
+    path = _path(key)
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    except OSError:
+        return None
+    try:
+        os.utime(path)  # mtime = ใช้ล่าสุด (ใช้ไล่ออกแบบ LRU)
+    except OSError:
+        pass
+    return data
+
+
+def put(key, data):
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)  # เขียนเสร็จค่อยย้าย หลาย process อ่านพร้อมกันไม่เจอไฟล์ครึ่งๆ
+    # เดินทั้งโฟลเดอร์เฉพาะครั้งแรกและเมื่อยอดประมาณเกินเพดาน (ไฟล์ที่ process อื่นเขียนจะนับตอนเดินครั้งถัดไป)
+    with _evict_lock:
+        total = _cache_bytes.get(CACHE_DIR)
+        if total is not None:
+            total = _cache_bytes[CACHE_DIR] = total + len(data)
+    if total is None or total > CACHE_MAX_BYTES:
+        evict()
+
+
+def evict(max_bytes=CACHE_MAX_BYTES, low_water=CACHE_LOW_WATER):
+    with _evict_lock:
+        entries, total = [], 0
+        for root, _, files in os.walk(CACHE_DIR):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total > max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= max_bytes * low_water:
+                    break
+        _cache_bytes[CACHE_DIR] = total
+
+
+def fetch(prompt, seed, model=DEFAULT_MODEL, size=DEFAULT_SIZE):
+    # คืน bytes ของภาพ — จากแคชถ้ามี ไม่งั้นโหลดแล้วเก็บลงแคช
+    key = cache_key(prompt, seed, model, size)
+    data = get(key)
+    if data is None:
+        with metrics.span('image_download'):
+            data = http_client.get_content(build_image_url(prompt, seed, model, size), conditional=False,
+                                           timeout=(http_client.CONNECT_TIMEOUT, IMAGE_READ_TIMEOUT))
+        put(key, data)
+    return data
+
+
+class PrefetchPool:
+    # เก็บ seed ที่ภาพพร้อมแล้ว (อยู่ในแคชดิสก์) ต่อ prompt; take() หยิบออกแล้วเติมใหม่เบื้องหลัง
+    def __init__(self, per_prompt=PREFETCH_PER_PROMPT, workers=PREFETCH_WORKERS):
+        self.per_prompt = per_prompt
+        self._ready = {}       # prompt -> deque ของ seed
+        self._inflight = {}    # prompt -> จำนวนงานที่กำลังโหลด
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="prefetch")
+
+    def _load(self, prompt, seed):
+        try:
+            fetch(prompt, seed)
+            ok = True
+        except Exception:
+            ok = False
+        with self._lock:
+            self._inflight[prompt] -= 1
+            if ok:
+                self._ready.setdefault(prompt, deque()).append(seed)
+
+    def refill(self, prompt):
+        with self._lock:
+            missing = self.per_prompt - len(self._ready.get(prompt, ())) - self._inflight.get(prompt, 0)
+            self._inflight[prompt] = self._inflight.get(prompt, 0) + max(0, missing)
+        for _ in range(missing):
+            self._executor.submit(self._load, prompt, random.randint(1, 999999))
+
+    def warm(self, prompts):
+        for prompt in prompts:
+            self.refill(prompt)
+
+    def take(self, prompt):
+        # คืน (seed, bytes) ถ้ามีภาพรออยู่ ไม่งั้น None — ทั้งสองกรณีสั่งเติมคิวของ prompt นี้
+        data = None
+        while data is None:
+            with self._lock:
+                ready = self._ready.get(prompt)
+                seed = ready.popleft() if ready else None
+            if seed is None:
+                break
+            data = get(cache_key(prompt, seed))  # อาจถูกไล่ออกจากแคชไปแล้ว
+        self.refill(prompt)
+        return (seed, data) if data is not None else None
+
+    def ready_count(self, prompt):
+        with self._lock:
+            return len(self._ready.get(prompt, ()))
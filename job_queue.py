@@ -0,0 +1,239 @@
+import json
+import time
+
+import db
+
+# คิวงานในเครื่องบนตาราง jobs ของ merchant_data.db — หน้าเว็บส่งงาน (submit) แล้วคอยดูผล (follow/wait)
+# ส่วนงานช้าๆ (ดึงหน้าเว็บ + Gemini, สร้างภาพ) ให้ worker.py ทำ: ผู้ใช้ปิดแท็บ/กดอย่างอื่น งานก็ยังเดินต่อ
+# worker หยิบงานด้วย claim() ใน BEGIN IMMEDIATE (สองตัวไม่ได้งานเดียวกัน) และต่ออายุ lease ทุก HEARTBEAT_EVERY
+# worker ตายกลางงาน -> lease หมด งานกลับเข้าคิวเอง; งานล้มเหลว -> ลองใหม่แบบ backoff จนครบ max_attempts
+#   สถานะ: queued -> running -> done | failed   (ล้มแต่ยังมีสิทธิ์ลอง: running -> queued)
+
+# --- CONFIG ---
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 2.0          # วินาที — รอบที่ n รอ base * 2^(n-1)
+LEASE_SECONDS = 60          # worker ไม่ต่อ lease เกินนี้ถือว่าตาย
+HEARTBEAT_EVERY = 10
+WORKER_TIMEOUT = 30         # ไม่มี heartbeat เกินนี้ = worker ไม่อยู่แล้ว (หน้าเว็บทำงานเองแทน)
+POLL_INTERVAL = 0.25        # หน้าเว็บอ่านสถานะงานทุกกี่วินาที
+FOLLOW_TIMEOUT = 300
+QUEUE_TIMEOUT = FOLLOW_TIMEOUT   # งานที่ยังไม่เสร็จหลังเท่านี้ (ไม่มีหน้าเว็บรอผลแล้ว) -> failed และลบ API key
+KEEP_SECONDS = 24 * 60 * 60  # งานที่จบแล้วเก็บไว้ 1 วัน
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    pid INTEGER,
+    heartbeat REAL NOT NULL,
+    jobs_done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_FIELDS = ('id', 'kind', 'payload', 'status', 'progress', 'result', 'error', 'attempts', 'max_attempts',
+           'worker', 'created_at', 'updated_at')
+_JSON_FIELDS = ('payload', 'progress', 'result')
+# API key ใน payload ถูกลบทันทีที่งานจบ (สำเร็จหรือล้ม) ไม่ค้างอยู่ในฐานข้อมูล
+# งานที่ไม่มี worker มาหยิบ (worker ตายหมด) ก็ถูกลบ key เมื่อเกิน QUEUE_TIMEOUT ผ่าน expire()
+_SCRUB = "payload = json_remove(payload, '$.api_key')"
+
+class JobError(Exception):
+    # ข้อผิดพลาดที่ลองใหม่ก็ไม่หาย (เช่น API key ผิด) — worker ให้งาน failed ทันที
+    pass
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _job(values):
+    job = dict(zip(_FIELDS, values))
+    for field in _JSON_FIELDS:
+        if job[field] is not None:
+            job[field] = json.loads(job[field])
+    return job
+
+
+# --- ฝั่งหน้าเว็บ ---
+def submit(kind, payload, max_attempts=MAX_ATTEMPTS):
+    now = time.time()
+    expire(now)
+    with db.session(schema=_SCHEMA) as conn:
+        cur = conn.execute("INSERT INTO jobs (kind, payload, status, max_attempts, run_after, created_at, updated_at) "
+                           "VALUES (?, ?, 'queued', ?, ?, ?, ?)", (kind, _dumps(payload), max_attempts, now, now, now))
+    return cur.lastrowid
+
+
+def get(job_id):
+    conn = db.ensure_schema(_SCHEMA)
+    values = conn.execute("SELECT " + ", ".join(_FIELDS) + " FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job(values) if values else None
+
+
+def workers_alive(now=None):
+    now = time.time() if now is None else now
+    conn = db.ensure_schema(_SCHEMA)
+    alive = conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat > ?", (now - WORKER_TIMEOUT,)).fetchone()[0]
+    if not alive:
+        expire(now)   # ไม่มี worker มาหยิบงานที่ค้าง -> อย่าให้ API key ค้างอยู่ในฐานข้อมูล
+    return alive
+
+
+def expire(now=None, timeout=QUEUE_TIMEOUT):
+    # งานที่สร้างนานเกิน timeout แล้วยังรอคิว (หรือ worker ตายระหว่างทำ lease หมดแล้ว) -> failed + ลบ API key
+    now = time.time() if now is None else now
+    with db.session(schema=_SCHEMA) as conn:
+        return conn.execute("UPDATE jobs SET status = 'failed', error = 'หมดเวลารอคิว', worker = NULL, "
+                            "lease_until = NULL, updated_at = ?, " + _SCRUB + " WHERE created_at < ? AND "
+                            "(status = 'queued' OR (status = 'running' AND lease_until < ?))",
+                            (now, now - timeout, now)).rowcount
+
+
+def follow(job_id, poll=POLL_INTERVAL, timeout=FOLLOW_TIMEOUT):
+    # yield (stage, data) ทุกครั้งที่สถานะ/progress เปลี่ยน จนจบด้วย ('done', result) หรือ ('failed', error)
+    #   ('queued', None) รอคิว, ('retry', {'attempt', 'error'}) ล้มแล้วรอลองใหม่, อื่นๆ = (stage, data) ที่ worker รายงาน
+    deadline = time.monotonic() + timeout
+    last = None
+    while True:
+        job = get(job_id)
+        if job is None:
+            yield 'failed', 'ไม่พบงาน'
+            return
+        if job['status'] == 'done':
+            yield 'done', job['result']
+            return
+        if job['status'] == 'failed':
+            yield 'failed', job['error']
+            return
+        if job['status'] == 'queued':
+            current = ('retry', {'attempt': job['attempts'], 'error': job['error']}) if job['attempts'] \
+                else ('queued', None)
+        else:
+            current = tuple(job['progress']) if job['progress'] else None
+        if current is not None and current != last:
+            yield current
+            last = current
+        if time.monotonic() > deadline:
+            expire()
+            yield 'failed', 'หมดเวลารอผล'
+            return
+        time.sleep(poll)
+
+
+def wait(job_id, poll=POLL_INTERVAL, timeout=FOLLOW_TIMEOUT):
+    # รอจนจบ ไม่สนขั้นตอนระหว่างทาง — คืน (ok, result หรือ error)
+    for stage, data in follow(job_id, poll, timeout):
+        if stage in ('done', 'failed'):
+            return stage == 'done', data
+
+
+# --- ฝั่ง worker ---
+def claim(worker, kinds=None, now=None):
+    # หยิบงานที่ถึงคิวเก่าสุดหนึ่งงาน (รวมงานที่ worker ตัวก่อนตายค้างไว้) — คืน job dict หรือ None
+    now = time.time() if now is None else now
+    with db.immediate(schema=_SCHEMA) as conn:
+        expired = "status = 'running' AND lease_until < ?"
+        conn.execute("UPDATE jobs SET " + _SCRUB + " WHERE " + expired + " AND attempts >= max_attempts", (now,))
+        conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                     "error = 'worker หยุดทำงานกลางคัน', worker = NULL, updated_at = ? WHERE " + expired, (now, now))
+        sql = "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?"
+        args = [now]
+        if kinds:
+            sql += " AND kind IN (" + ", ".join("?" * len(kinds)) + ")"
+            args.extend(kinds)
+        row = conn.execute(sql + " ORDER BY id LIMIT 1", args).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ?, "
+                     "progress = NULL, updated_at = ? WHERE id = ?", (worker, now + LEASE_SECONDS, now, row[0]))
+    return get(row[0])
+
+
+def report(job_id, stage, data=None):
+    with db.session(schema=_SCHEMA) as conn:
+        conn.execute("UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                     (_dumps([stage, data]), time.time(), job_id))
+
+
+def _owned(worker):
+    # เงื่อนไขว่างานยังเป็นของผู้เรียก: lease หมดแล้ว claim()/expire() อาจ requeue/fail + ลบ API key ไปแล้ว
+    # หรือ worker ตัวอื่นหยิบไปทำใหม่ — ผลที่มาช้าต้องไม่ทับสถานะนั้น
+    return (" AND status = 'running' AND worker = ?", (worker,)) if worker else (" AND status = 'running'", ())
+
+
+def complete(job_id, result, worker=None):
+    # คืน False ถ้างานไม่ได้อยู่ในมือ worker นี้แล้ว (ผลถูกทิ้ง)
+    now = time.time()
+    guard, args = _owned(worker)
+    with db.session(schema=_SCHEMA) as conn:
+        done = conn.execute("UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, "
+                            "updated_at = ?, " + _SCRUB + " WHERE id = ?" + guard,
+                            (_dumps(result), now, job_id, *args)).rowcount
+        if done and worker:
+            conn.execute("UPDATE workers SET jobs_done = jobs_done + 1 WHERE name = ?", (worker,))
+    return bool(done)
+
+
+def fail(job_id, error, retry=True, worker=None, now=None):
+    # ยังลองได้อีก -> กลับเข้าคิวพร้อม backoff คืน True; ครบแล้ว (หรือ retry=False) -> failed คืน False
+    # งานไม่ได้อยู่ในมือ worker นี้แล้ว -> ไม่แตะอะไร คืน None
+    now = time.time() if now is None else now
+    guard, args = _owned(worker)
+    with db.immediate(schema=_SCHEMA) as conn:
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?" + guard, (job_id, *args)).fetchone()
+        if row is None:
+            return None
+        attempts, max_attempts = row
+        if retry and attempts < max_attempts:
+            conn.execute("UPDATE jobs SET status = 'queued', error = ?, worker = NULL, lease_until = NULL, "
+                         "run_after = ?, updated_at = ? WHERE id = ?" + guard,
+                         (error, now + BACKOFF_BASE * 2 ** (attempts - 1), now, job_id, *args))
+            return True
+        conn.execute("UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ?, " + _SCRUB +
+                     " WHERE id = ?" + guard, (error, now, job_id, *args))
+        return False
+
+
+def heartbeat(worker, pid, now=None):
+    # worker ยังอยู่ + ต่อ lease ของงานที่ถืออยู่ทั้งหมด
+    now = time.time() if now is None else now
+    with db.session(schema=_SCHEMA) as conn:
+        conn.execute("INSERT INTO workers (name, pid, heartbeat) VALUES (?, ?, ?) "
+                     "ON CONFLICT(name) DO UPDATE SET pid = excluded.pid, heartbeat = excluded.heartbeat",
+                     (worker, pid, now))
+        conn.execute("UPDATE jobs SET lease_until = ? WHERE worker = ? AND status = 'running'",
+                     (now + LEASE_SECONDS, worker))
+
+
+def retire(worker):
+    with db.session(schema=_SCHEMA) as conn:
+        conn.execute("DELETE FROM workers WHERE name = ?", (worker,))
+
+
+def purge(older_than=KEEP_SECONDS, now=None):
+    now = time.time() if now is None else now
+    expire(now)
+    with db.session(schema=_SCHEMA) as conn:
+        conn.execute("DELETE FROM workers WHERE heartbeat < ?", (now - older_than,))
+        return conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                            (now - older_than,)).rowcount
+
+
+def counts():
+    return dict(db.ensure_schema(_SCHEMA).execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
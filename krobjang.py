@@ -1,8 +1,14 @@
+import io
 import streamlit as st
-import google.generativeai as genai
-import requests
-from bs4 import BeautifulSoup
-import re
+
+import admin_view
+import analysis_cache
+import job_queue
+import metrics
+import quota
+import usage_stats
+from krobjang_core import PROMPT_HASH, SECTION_KEYS, init_gemini, detect_platform, analyze_pipeline
+import krobjang_bulk
 
 # --- CONFIG ---
 st.set_page_config(
@@ -10,6 +16,7 @@ st.set_page_config(
     page_icon="🤖",
     layout="centered"
 )
+metrics.serve()   # เปิด /metrics ถ้าตั้ง METRICS_PORT
 
 # --- CSS ---
 st.markdown("""
@@ -77,81 +84,82 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- SESSION STATE ---
-if 'quota_used' not in st.session_state:
-    st.session_state.quota_used = 0
 if 'is_pro' not in st.session_state:
     st.session_state.is_pro = False
+if 'license_hash' not in st.session_state:
+    st.session_state.license_hash = None
 if 'gemini_key' not in st.session_state:
     st.session_state.gemini_key = ""
-if 'model' not in st.session_state:
-    st.session_state.model = None
-
-FREE_LIMIT = 5
-
-# --- FUNCTIONS ---
-def init_gemini(api_key):
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash-8b')
-        return model, True
-    except:
-        return None, False
-
-def detect_platform(url):
-    if 'tiktok.com' in url:
-        return 'TikTok'
-    elif 'shopee.co.th' in url:
-        return 'Shopee'
-    elif 'lazada.co.th' in url:
-        return 'Lazada'
-    return None
-
-def fetch_page_text(url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        res = requests.get(url, headers=headers, timeout=8)
-        soup = BeautifulSoup(res.text, 'html.parser')
-        for tag in soup(['script', 'style', 'nav', 'footer', 'header']):
-            tag.decompose()
-        text = soup.get_text(separator=' ', strip=True)
-        return text[:3000]
-    except:
+if 'analyzed_urls' not in st.session_state:
+    st.session_state.analyzed_urls = set()   # ลิงก์ (canonical) ที่วิเคราะห์ไปแล้ว — ไว้นับการกดซ้ำ
+if 'analyze_job' not in st.session_state:
+    st.session_state.analyze_job = None      # (job id, platform, ถังโควต้าฟรี) ที่ส่งเข้าคิวแล้วยังไม่ได้แสดงผล
+
+FREE_LIMIT = quota.FREE_LIMIT
+client = quota.client_id()
+
+def render_section(box, key, text):
+    if not text:
+        box.empty()
+        return
+    with box.container():
+        if key == 'points':
+            st.markdown('<div class="result-box"><div class="result-title">✨ จุดเด่นของสินค้า</div>' +
+                text.replace('\n', '<br>') + '</div>', unsafe_allow_html=True)
+        elif key == 'caption':
+            st.markdown('<div class="result-box"><div class="result-title">✏️ แคปชั่นทำเงิน</div>' +
+                f'<div class="caption-text">{text}</div></div>', unsafe_allow_html=True)
+            st.code(text, language=None)
+        elif key == 'hashtags':
+            st.markdown('<div class="result-box"><div class="result-title">#️⃣ Hashtag แนะนำ</div>' +
+                f'<div class="hashtag-text">{text}</div></div>', unsafe_allow_html=True)
+            st.code(text, language=None)
+        elif key == 'tips':
+            st.info(f"💡 **คำแนะนำ:** {text}")
+
+def show_analysis(platform, events):
+    # events = (stage, data) จาก analyze_pipeline (ทำเอง) หรือ job_queue.follow (worker ทำ) — แสดงผลแบบเดียวกัน
+    # คืนผลของขั้น 'done' หรือ None ถ้าไม่สำเร็จ
+    status = st.empty()
+    boxes = {key: st.empty() for key in ('points', 'caption', 'hashtags')}
+    copy_box = st.empty()
+    boxes['tips'] = st.empty()
+    shown = {}
+    result = None
+    for stage, data in events:
+        if stage == 'queued':
+            status.info("🕒 รอคิว...")
+        elif stage == 'retry':
+            status.warning(f"🔁 ขัดข้อง กำลังลองใหม่ (ครั้งที่ {data['attempt'] + 1})...")
+        elif stage == 'fetch':
+            status.info(f"⏳ กำลังดึงข้อมูลจาก {platform}...")
+        elif stage == 'ai':
+            status.info("✍️ AI กำลังเขียน...")
+        elif stage == 'stream':
+            # เติมแต่ละกล่องทันทีที่ข้อความมาถึง ไม่ต้องรอครบทั้ง 4 ส่วน
+            for key, text in data.items():
+                if shown.get(key) != text:
+                    render_section(boxes[key], key, text)
+                    shown[key] = text
+        elif stage == 'failed':
+            status.error("❌ วิเคราะห์ไม่สำเร็จ ลองใหม่อีกครั้งครับ")
+        elif stage == 'done':
+            result = data
+    if result is None:
         return None
 
-def analyze_with_ai(model, platform, page_text, url):
-    prompt = f"""คุณคือ "Krobjang AI" ผู้เชี่ยวชาญด้านการตลาดดิจิทัลและ TikTok Affiliate ที่เก่งที่สุดในประเทศไทย
-
-วิเคราะห์สินค้าจาก{platform}:
-URL: {url}
-ข้อมูล: {page_text if page_text else 'วิเคราะห์จาก URL'}
-
-ตอบเป็นภาษาไทย 100% เท่านั้น ห้ามใช้ภาษาอื่นแม้แต่คำเดียว แบ่งเป็น 4 ส่วน:
-
-1.) จุดเด่นของสินค้า
-- บอกจุดเด่น 3 ข้อ เฉพาะเจาะจงกับสินค้านี้เท่านั้น
-
-2.) แคปชั่นทำเงิน
-เขียนแคปชั่น 1 ประโยคที่ดึงดูดใจ ใช้จิตวิทยาการตลาด กระตุ้นให้อยากซื้อทันที ใช้ Emoji เหมาะสม ห้ามพูดทั่วไป ต้องเฉพาะกับสินค้านี้เท่านั้น
-
-3.) Hashtag แนะนำ
-แนะนำ 6-8 hashtag ที่ตรงกับสินค้าและกลุ่มเป้าหมายจริงๆ
-
-4.) คำแนะนำเพิ่มเติม
-เทคนิคเพิ่มยอดขาย 2 ข้อ อิงจากข้อมูลจริงที่เห็น"""
-
-    response = model.generate_content(prompt)
-    return response.text
-
-def parse_result(text):
-    result = {'points': '', 'caption': '', 'hashtags': '', 'tips': ''}
-    points_match = re.search(r'1[.)]\s*จุดเด่น[^\n]*\n([\s\S]*?)(?=\n2[.)]|\Z)', text)
-    caption_match = re.search(r'2[.)]\s*แคปชั่น[^\n]*\n([\s\S]*?)(?=\n3[.)]|\Z)', text)
-    hashtag_match = re.search(r'3[.)]\s*Hashtag[^\n]*\n([\s\S]*?)(?=\n4[.)]|\Z)', text)
-    tips_match = re.search(r'4[.)]\s*คำแนะนำ[^\n]*\n([\s\S]*?)(?=\n5[.)]|\Z)', text)
-    if points_match: result['points'] = points_match.group(1).strip()
-    if caption_match: result['caption'] = caption_match.group(1).strip()
-    if hashtag_match: result['hashtags'] = hashtag_match.group(1).strip().replace('\n', ' ')
-    if tips_match: result['tips'] = tips_match.group(1).strip()
+    parsed, similar = result['parsed'], result['similar']
+    for key in SECTION_KEYS:
+        render_section(boxes[key], key, parsed[key])
+    status.success(f"✅ วิเคราะห์เสร็จแล้วครับ! (จาก {platform}{' · แคช' if result['cached'] else ''})")
+    if similar:
+        st.caption(f"♻️ ใช้ผลจากสินค้าที่เหมือนกัน {similar['score']:.0%} — {similar['url']}")
+
+    if parsed['caption'] and parsed['hashtags']:
+        full_text = f"{parsed['caption']}\n\n{parsed['hashtags']}"
+        with copy_box.container():
+            st.code(full_text, language=None)
+            st.caption("👆 Copy แคปชั่น + Hashtag พร้อมโพสต์ได้เลยครับ")
     return result
 
 # --- UI ---
@@ -163,7 +171,7 @@ st.divider()
 if st.session_state.is_pro:
     st.markdown('<span class="badge-pro">⭐ Pro — ไม่จำกัดครั้ง</span>', unsafe_allow_html=True)
 else:
-    remaining = FREE_LIMIT - st.session_state.quota_used
+    remaining = quota.remaining(client)
     st.markdown(f'<span class="badge-free">🆓 Free — เหลือ {remaining}/{FREE_LIMIT} ครั้งวันนี้</span>', unsafe_allow_html=True)
 
 st.markdown("")
@@ -187,10 +195,9 @@ with st.expander("🔑 ใส่ Gemini API Key ของคุณ (จำเป
     
     if st.button("✅ บันทึก API Key", key="save_api"):
         if api_key_input.startswith("AIza"):
-            model_test, ok = init_gemini(api_key_input)
+            _, ok = init_gemini(api_key_input)
             if ok:
                 st.session_state.gemini_key = api_key_input
-                st.session_state.model = model_test
                 st.success("✅ API Key ใช้งานได้ครับ!")
             else:
                 st.error("❌ API Key ไม่ถูกต้อง ลองใหม่ครับ")
@@ -203,9 +210,10 @@ st.markdown("")
 with st.expander("🏆 มี License Key Pro? กดที่นี่"):
     key_input = st.text_input("ใส่ License Key:", placeholder="KROB-XXXX-XXXX-XXXX", label_visibility="collapsed")
     if st.button("ยืนยัน Key", key="verify_key"):
-        valid_keys = st.secrets.get("LICENSE_KEYS", "").split(",")
-        if key_input.strip() in [k.strip() for k in valid_keys]:
+        license_hash = quota.verify_license(key_input)
+        if license_hash:
             st.session_state.is_pro = True
+            st.session_state.license_hash = license_hash
             st.success("✅ เปิดใช้งาน Pro แล้ว! ไม่จำกัดครั้งครับ")
         else:
             st.error("❌ Key ไม่ถูกต้อง ติดต่อเราทาง Line ครับ")
@@ -226,47 +234,88 @@ if st.button("🚀 วิเคราะห์เลย!", key="analyze"):
         st.warning("⚠️ กรุณาใส่ลิงก์สินค้าก่อนนะครับ")
     else:
         platform = detect_platform(url_input)
+        analyze_buckets = quota.buckets(client, st.session_state.license_hash)
+        allowed, retry_after, blocked = (False, 0, None) if not platform else quota.take(analyze_buckets)
+        # ดึงหน้า/Gemini ล้ม งานในคิว failed หรือผู้ใช้กดอย่างอื่นกลางทาง -> คืนโควต้าฟรี (เหมือนโหมด Bulk)
+        free_bucket = None if st.session_state.is_pro else analyze_buckets[0]
         if not platform:
             st.error("❌ รองรับเฉพาะ TikTok, Shopee และ Lazada ครับ")
-        elif not st.session_state.is_pro and st.session_state.quota_used >= FREE_LIMIT:
-            st.error("🔒 ใช้ครบโควต้าวันนี้แล้วครับ (5 ครั้ง/วัน)")
+        elif blocked == 'free':
+            st.error(f"🔒 ใช้ครบโควต้าวันนี้แล้วครับ ({FREE_LIMIT} ครั้ง/วัน)")
             st.info("อัปเกรดเป็น Pro เพื่อใช้งานไม่จำกัด → [ติดต่อทาง Line](https://line.me/ti/p/@vfk5903b)")
+        elif not allowed:
+            st.warning(f"⏱️ ส่งคำขอถี่เกินไป รออีก {retry_after:.0f} วินาทีนะครับ")
         else:
-            # init model ถ้ายังไม่ได้ init
-            if not st.session_state.model:
-                st.session_state.model, _ = init_gemini(st.session_state.gemini_key)
-            
-            with st.spinner(f"⏳ กำลังวิเคราะห์จาก {platform}..."):
-                page_text = fetch_page_text(url_input)
-                raw_result = analyze_with_ai(st.session_state.model, platform, page_text, url_input)
-                parsed = parse_result(raw_result)
-                if not st.session_state.is_pro:
-                    st.session_state.quota_used += 1
-
-            st.success(f"✅ วิเคราะห์เสร็จแล้วครับ! (จาก {platform})")
-            st.divider()
-
-            if parsed['points']:
-                st.markdown('<div class="result-box"><div class="result-title">✨ จุดเด่นของสินค้า</div>' +
-                    parsed['points'].replace('\n', '<br>') + '</div>', unsafe_allow_html=True)
-
-            if parsed['caption']:
-                st.markdown('<div class="result-box"><div class="result-title">✏️ แคปชั่นทำเงิน</div>' +
-                    f'<div class="caption-text">{parsed["caption"]}</div></div>', unsafe_allow_html=True)
-                st.code(parsed['caption'], language=None)
-
-            if parsed['hashtags']:
-                st.markdown('<div class="result-box"><div class="result-title">#️⃣ Hashtag แนะนำ</div>' +
-                    f'<div class="hashtag-text">{parsed["hashtags"]}</div></div>', unsafe_allow_html=True)
-                st.code(parsed['hashtags'], language=None)
-
-            if parsed['caption'] and parsed['hashtags']:
-                full_text = f"{parsed['caption']}\n\n{parsed['hashtags']}"
-                st.code(full_text, language=None)
-                st.caption("👆 Copy แคปชั่น + Hashtag พร้อมโพสต์ได้เลยครับ")
-
-            if parsed['tips']:
-                st.info(f"💡 **คำแนะนำ:** {parsed['tips']}")
+            url_key = analysis_cache.canonicalize_url(url_input)
+            usage_stats.incr('analyze_requests', *(['reruns'] if url_key in st.session_state.analyzed_urls else []))
+            st.session_state.analyzed_urls.add(url_key)
+
+            # มี worker -> ส่งเข้าคิวแล้วดูความคืบหน้า (ปิดแท็บ/กดอย่างอื่นงานก็ไม่หาย ผลลงแคช)
+            # ไม่มี worker หรือมีในแคชแล้ว -> ทำเองใน session นี้เหมือนเดิม
+            if job_queue.workers_alive() and not analysis_cache.contains(url_input, PROMPT_HASH):
+                job_id = job_queue.submit('analyze', {'url': url_input, 'platform': platform,
+                                                      'api_key': st.session_state.gemini_key})
+                st.session_state.analyze_job = (job_id, platform, free_bucket)
+            else:
+                # โมเดลต่อ API key ถูกแคชไว้ทั้ง process ไม่ได้สร้างใหม่ต่อ session
+                model, _ = init_gemini(st.session_state.gemini_key)
+                done = False
+                try:
+                    done = show_analysis(platform, analyze_pipeline(model, url_input, platform)) is not None
+                finally:
+                    if not done and free_bucket:
+                        quota.refund(free_bucket, 1)
+
+# งานในคิวที่ยังไม่ได้แสดงผล (เพิ่งส่ง หรือ rerun กลางทางเพราะกดปุ่มอื่น) -> ตามต่อจนเสร็จ
+# rerun กลางทางไม่คืนโควต้า — งานยังเดินต่อใน worker และรอบถัดไปตามผลต่อ
+if st.session_state.analyze_job:
+    job_id, job_platform, job_bucket = st.session_state.analyze_job
+    if show_analysis(job_platform, job_queue.follow(job_id)) is None and job_bucket:
+        quota.refund(job_bucket, 1)
+    st.session_state.analyze_job = None
+
+# --- BULK MODE ---
+with st.expander("📦 วิเคราะห์หลายลิงก์พร้อมกัน (Bulk)"):
+    bulk_text = st.text_area("วางลิงก์ บรรทัดละ 1 ลิงก์:", height=150, key="bulk_text")
+    bulk_file = st.file_uploader("หรืออัปโหลดไฟล์ CSV / TXT", type=["csv", "txt"], key="bulk_file")
+    bulk_concurrency = st.slider("เรียก AI พร้อมกันสูงสุด", 1, 16, krobjang_bulk.LLM_CONCURRENCY, key="bulk_concurrency")
+
+    if st.button("🚀 วิเคราะห์ทั้งหมด", key="analyze_bulk"):
+        lines = bulk_text.splitlines()
+        if bulk_file:
+            lines += bulk_file.getvalue().decode("utf-8-sig", errors="ignore").splitlines()
+        urls = krobjang_bulk.read_urls(lines)
+        if not st.session_state.is_pro:
+            urls = urls[:quota.remaining(client)]
+        bulk_buckets = quota.buckets(client, st.session_state.license_hash, analyses=len(urls))
+
+        if not st.session_state.gemini_key:
+            st.warning("⚠️ กรุณาใส่ Gemini API Key ก่อนนะครับ (ฟรี สมัครได้ที่ aistudio.google.com)")
+        elif not urls:
+            st.warning("⚠️ ไม่พบลิงก์ หรือโควต้าฟรีหมดแล้วครับ")
+        elif not quota.take(bulk_buckets)[0]:
+            st.warning("⏱️ ส่งคำขอถี่เกินไป หรือโควต้าไม่พอ ลองใหม่อีกครั้งนะครับ")
+        else:
+            model, _ = init_gemini(st.session_state.gemini_key)
+
+            progress = st.progress(0.0, text=f"⏳ 0/{len(urls)}")
+            table = st.empty()
+            out = io.StringIO()
+            rows = []
+            # ผลทยอยออกมาทีละแถวที่เสร็จ ไม่ต้องรอครบทุกลิงก์
+            for row in krobjang_bulk.write_csv(
+                    krobjang_bulk.run_bulk(model, urls, llm_concurrency=bulk_concurrency), out):
+                rows.append(row)
+                progress.progress(len(rows) / len(urls), text=f"⏳ {len(rows)}/{len(urls)}")
+                table.dataframe([{k: r[k] for k in ('status', 'platform', 'caption', 'url')} for r in rows],
+                                use_container_width=True)
+
+            failed = sum(1 for r in rows if r['status'] != 'ok')
+            if failed and not st.session_state.is_pro:
+                quota.refund(bulk_buckets[0], failed)   # ลิงก์ที่ล้มเหลวไม่นับโควต้า
+            st.success(f"✅ เสร็จแล้ว {len(rows)} ลิงก์")
+            st.download_button("💾 ดาวน์โหลด CSV", out.getvalue().encode("utf-8-sig"),
+                               file_name="krobjang_results.csv", mime="text/csv")
 
 st.divider()
 st.markdown("""
@@ -275,3 +324,5 @@ st.markdown("""
     <a href="https://line.me/ti/p/@vfk5903b" style="color:#fe2c55;">💬 ซื้อ Pro หรือสอบถามทาง Line</a>
 </div>
 """, unsafe_allow_html=True)
+
+admin_view.render()
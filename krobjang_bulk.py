@@ -0,0 +1,202 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import analysis_cache
+import http_client
+import page_extract
+import product_store
+import usage_stats
+from krobjang_core import (PROMPT_HASH, STRUCTURED_OUTPUT, init_gemini, detect_platform, fetch_page_text,
+                           analyze_with_ai, parse_response)
+
+# --- CONFIG ---
+FETCH_WORKERS = 16      # ดึงหน้าเว็บพร้อมกันได้กี่ลิงก์
+LLM_CONCURRENCY = 4     # เรียก Gemini พร้อมกันได้กี่ตัว (ปรับตามโควต้า API key)
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0      # วินาที — รอบที่ n รอ base * 2^n + jitter
+
+CSV_FIELDS = ['url', 'platform', 'name', 'price', 'status', 'points', 'caption', 'hashtags', 'tips', 'cached',
+              'similar_to', 'match_score', 'error', 'seconds']
+
+try:
+    from google.api_core import exceptions as _gexc
+    RATE_LIMIT_ERRORS = (_gexc.ResourceExhausted, _gexc.TooManyRequests, _gexc.ServiceUnavailable)
+except ImportError:
+    RATE_LIMIT_ERRORS = ()
+
+
+class RateGate:
+    # โดน 429 เมื่อไหร่ ทุก worker หยุดรอพร้อมกัน ไม่ใช่ต่างคนต่างยิงซ้ำ
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def penalize(self, attempt):
+        delay = BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + delay)
+
+
+def _is_rate_limited(err):
+    return isinstance(err, RATE_LIMIT_ERRORS) or '429' in str(err)
+
+
+def read_urls(lines):
+    # รับได้ทั้งข้อความหลายบรรทัดและแถว CSV — เก็บเฉพาะช่องที่เป็นลิงก์ ตัดซ้ำโดยดูลิงก์แบบ canonical
+    urls, seen = [], set()
+    for line in lines:
+        for cell in line.replace(',', ' ').split():
+            cell = cell.strip().strip('"')
+            if not cell.startswith('http'):
+                continue
+            key = analysis_cache.canonicalize_url(cell)
+            if key not in seen:
+                seen.add(key)
+                urls.append(cell)
+    return urls
+
+
+def _generate(model, gate, platform, page_text, url, structured=STRUCTURED_OUTPUT):
+    for attempt in range(MAX_RETRIES + 1):
+        gate.wait()
+        try:
+            return analyze_with_ai(model, platform, page_text, url, structured)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            gate.penalize(attempt)
+
+
+def _row(url, platform, started, parsed=None, cached=False, error=None, page_text=None, similar=None):
+    info = page_extract.parse_summary(page_text)
+    row = {'url': url, 'platform': platform or '', 'name': info.get('name', ''), 'price': info.get('price', ''),
+           'status': 'error' if error else 'ok', 'cached': int(cached),
+           'similar_to': similar['url'] if similar else '', 'match_score': similar['score'] if similar else '',
+           'error': error or '', 'seconds': round(time.monotonic() - started, 2)}
+    row.update(parsed or {'points': '', 'caption': '', 'hashtags': '', 'tips': ''})
+    return row
+
+
+def run_bulk(model, urls, fetch_workers=FETCH_WORKERS, llm_concurrency=LLM_CONCURRENCY):
+    # generator: คืนผลทีละแถวตามลำดับที่เสร็จ (ไม่ใช่ลำดับที่ส่งเข้า)
+    import near_dup   # numpy โหลดเมื่อเริ่มงานจริง ไม่ใช่ตอน import โมดูลนี้
+    session = http_client.get_session()
+    gate = RateGate()
+    started = {}
+
+    def fetch(url):
+        started[url] = time.monotonic()
+        platform = detect_platform(url)
+        if not platform:
+            return url, platform, None, None, None
+        cached = analysis_cache.get(url, PROMPT_HASH)
+        if cached:
+            return url, platform, cached[0], cached[1], None
+        page_text = fetch_page_text(url, session)
+        similar = near_dup.find_similar(page_text, PROMPT_HASH, exclude_url=url)
+        if similar:
+            analysis_cache.put(url, PROMPT_HASH, page_text, similar['parsed'])
+            return url, platform, page_text, similar['parsed'], similar
+        return url, platform, page_text, None, None
+
+    def generate(url, platform, page_text):
+        parsed = parse_response(_generate(model, gate, platform, page_text, url), STRUCTURED_OUTPUT)
+        if any(parsed.values()):
+            analysis_cache.put(url, PROMPT_HASH, page_text, parsed)
+            near_dup.add(url, PROMPT_HASH, page_text, parsed)
+        return parsed
+
+    with ThreadPoolExecutor(fetch_workers) as fetch_pool, ThreadPoolExecutor(llm_concurrency) as llm_pool:
+        # None = งานดึงหน้า, (url, platform, page_text) = งาน Gemini — รอทั้งสองแบบพร้อมกันเพื่อส่งผลออกทันทีที่เสร็จ
+        pending = {fetch_pool.submit(fetch, u): None for u in urls}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                meta = pending.pop(fut)
+                if meta is None:
+                    url, platform, page_text, cached_parsed, similar = fut.result()
+                    if not platform:
+                        yield _row(url, platform, started[url], error='unsupported platform')
+                    elif cached_parsed is not None:
+                        yield _row(url, platform, started[url], cached_parsed, cached=True, page_text=page_text,
+                                   similar=similar)
+                    else:
+                        pending[llm_pool.submit(generate, url, platform, page_text)] = (url, platform, page_text)
+                    continue
+                url, platform, page_text = meta
+                try:
+                    yield _row(url, platform, started[url], fut.result(), page_text=page_text)
+                except Exception as e:
+                    yield _row(url, platform, started[url], error=str(e)[:200], page_text=page_text)
+
+
+def write_csv(rows, fh):
+    writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        fh.flush()
+        yield row
+
+
+def save_products(rows, batch_size=50):
+    # upsert ลงตาราง products เป็นก้อน (ลิงก์เดิมทับแถวเดิม) ระหว่างที่ส่งแถวต่อไปตามปกติ
+    batch = []
+    for row in rows:
+        if row['status'] == 'ok':
+            batch.append({'name': row['name'], 'price': row['price'] or None, 'link': row['url'],
+                          'platform': row['platform'], 'caption': row['caption'], 'hashtags': row['hashtags']})
+            if len(batch) >= batch_size:
+                product_store.upsert_products(batch)
+                batch = []
+        yield row
+    if batch:
+        product_store.upsert_products(batch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Krobjang AI — วิเคราะห์ลิงก์สินค้าทีละหลายลิงก์")
+    parser.add_argument('input', help="ไฟล์ .txt/.csv ที่มีลิงก์ (ใช้ - เพื่ออ่านจาก stdin)")
+    parser.add_argument('--out', default='krobjang_results.csv', help="ไฟล์ CSV ผลลัพธ์")
+    parser.add_argument('--db', action='store_true', help="บันทึกผลลงตาราง products ใน merchant_data.db ด้วย")
+    parser.add_argument('--key', default=os.environ.get('GEMINI_API_KEY', ''), help="Gemini API Key (หรือตั้ง GEMINI_API_KEY)")
+    parser.add_argument('--concurrency', type=int, default=LLM_CONCURRENCY, help="จำนวนการเรียก Gemini พร้อมกัน")
+    parser.add_argument('--fetch-workers', type=int, default=FETCH_WORKERS)
+    args = parser.parse_args(argv)
+
+    model, ok = init_gemini(args.key)
+    if not ok:
+        parser.error("Gemini API Key ไม่ถูกต้อง")
+    with (sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')) as fh:
+        urls = read_urls(fh)
+
+    t0 = time.monotonic()
+    done = 0
+    with open(args.out, 'w', newline='', encoding='utf-8-sig') as out:
+        rows = run_bulk(model, urls, args.fetch_workers, args.concurrency)
+        if args.db:
+            rows = save_products(rows)
+        for row in write_csv(rows, out):
+            done += 1
+            print(f"[{done}/{len(urls)}] {row['status']:5} {row['url']}", file=sys.stderr)
+    print(f"เสร็จ {done} ลิงก์ใน {time.monotonic() - t0:.1f} วินาที -> {args.out}", file=sys.stderr)
+    print(http_client.latency_report(), file=sys.stderr)
+    print(' '.join(f"{k}={v:.2%}" for k, v in usage_stats.rates().items()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import re
+import time
+
+import analysis_cache
+import gemini_client
+import http_client
+import metrics
+import page_extract
+import product_store
+import usage_stats
+
+logger = logging.getLogger('krobjang')
+
+# ฟังก์ชันวิเคราะห์สินค้าที่ใช้ร่วมกันระหว่างหน้าเว็บ (krobjang.py) และโหมด Bulk/CLI (krobjang_bulk.py)
+
+PROMPT_TEMPLATE = """คุณคือ "Krobjang AI" ผู้เชี่ยวชาญด้านการตลาดดิจิทัลและ TikTok Affiliate ที่เก่งที่สุดในประเทศไทย
+
+วิเคราะห์สินค้าจาก{platform}:
+URL: {url}
+ข้อมูล: {page_text}
+
+ตอบเป็นภาษาไทย 100% เท่านั้น ห้ามใช้ภาษาอื่นแม้แต่คำเดียว แบ่งเป็น 4 ส่วน:
+
+1.) จุดเด่นของสินค้า
+- บอกจุดเด่น 3 ข้อ เฉพาะเจาะจงกับสินค้านี้เท่านั้น
+
+2.) แคปชั่นทำเงิน
+เขียนแคปชั่น 1 ประโยคที่ดึงดูดใจ ใช้จิตวิทยาการตลาด กระตุ้นให้อยากซื้อทันที ใช้ Emoji เหมาะสม ห้ามพูดทั่วไป ต้องเฉพาะกับสินค้านี้เท่านั้น
+
+3.) Hashtag แนะนำ
+แนะนำ 6-8 hashtag ที่ตรงกับสินค้าและกลุ่มเป้าหมายจริงๆ
+
+4.) คำแนะนำเพิ่มเติม
+เทคนิคเพิ่มยอดขาย 2 ข้อ อิงจากข้อมูลจริงที่เห็น"""
+# เปลี่ยน prompt เมื่อไหร่ แคชเก่าจะไม่ถูกใช้อีกเอง
+PROMPT_HASH = analysis_cache.template_hash(PROMPT_TEMPLATE)
+
+# --- STRUCTURED OUTPUT ---
+# ขอคำตอบเป็น JSON ตาม schema แทนการแกะหัวข้อด้วย regex (ปิดด้วย KROBJANG_JSON=0)
+# JSON ใช้ไม่ได้เมื่อไหร่ค่อยถอยไปใช้ parse_result กับข้อความเดิม
+STRUCTURED_OUTPUT = os.environ.get("KROBJANG_JSON", "1") != "0"
+RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'points': {'type': 'array', 'items': {'type': 'string'}},
+        'caption': {'type': 'string'},
+        'hashtags': {'type': 'array', 'items': {'type': 'string'}},
+        'tips': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['points', 'caption', 'hashtags', 'tips'],
+}
+JSON_INSTRUCTION = """
+
+ส่งคำตอบเป็น JSON ตาม schema: points = จุดเด่น 3 ข้อ, caption = แคปชั่น 1 ประโยค, hashtags = hashtag 6-8 อัน (ขึ้นต้นด้วย #), tips = คำแนะนำ 2 ข้อ"""
+JSON_CONFIG = {'response_mime_type': 'application/json', 'response_schema': RESPONSE_SCHEMA}
+
+# --- FUNCTIONS ---
+def init_gemini(api_key):
+    # โมเดลถูกแคชต่อ process (gemini_client.get_model) — เรียกซ้ำทุก rerun ได้ไม่เสียเวลา
+    try:
+        return gemini_client.get_model(api_key), True
+    except:
+        logger.exception("สร้างโมเดล Gemini ไม่ได้")
+        return None, False
+
+def detect_platform(url):
+    if 'tiktok.com' in url:
+        return 'TikTok'
+    elif 'shopee.co.th' in url:
+        return 'Shopee'
+    elif 'lazada.co.th' in url:
+        return 'Lazada'
+    return None
+
+def fetch_page_text(url, session=None):
+    try:
+        # อ่านทีละ chunk: ดึง JSON-LD / og: / state JSON ก่อน แล้วหยุดทันทีที่ได้ข้อความพอ
+        # fetch = ถึงได้ header, extract = อ่าน body ทีละ chunk + แยกข้อความ (เวลาเน็ตกับ parse ปนกันในขั้นนี้)
+        with metrics.span('fetch'):
+            res = (session or http_client.get_session()).get(url, timeout=(http_client.CONNECT_TIMEOUT, 8), stream=True)
+        with metrics.span('extract'):
+            text, _, _ = page_extract.extract_response(res)
+        return text
+    except:
+        return None
+
+def build_prompt(platform, page_text, url, structured=False):
+    prompt = PROMPT_TEMPLATE.format(platform=platform, url=url, page_text=page_text if page_text else 'วิเคราะห์จาก URL')
+    return prompt + JSON_INSTRUCTION if structured else prompt
+
+def analyze_with_ai(model, platform, page_text, url, structured=False):
+    prompt = build_prompt(platform, page_text, url, structured)
+    with metrics.span('gemini'):
+        if structured:
+            return model.generate_content(prompt, generation_config=JSON_CONFIG).text
+
+        response = model.generate_content(prompt)
+        return response.text
+
+def analyze_with_ai_stream(model, platform, page_text, url, structured=False):
+    # เหมือน analyze_with_ai แต่คืนข้อความทีละ chunk ตามที่ Gemini ส่งมา
+    prompt = build_prompt(platform, page_text, url, structured)
+    kwargs = {'generation_config': JSON_CONFIG} if structured else {}
+    for chunk in model.generate_content(prompt, stream=True, **kwargs):
+        try:
+            text = chunk.text
+        except ValueError:  # chunk ที่ไม่มีข้อความ (เช่น safety/finish_reason)
+            continue
+        if text:
+            yield text
+
+def parse_result(text):
+    # แยกทั้งข้อความในรอบเดียวด้วยตัวแยกหัวข้อเดียวกับโหมด stream
+    stream = SectionStream()
+    stream.feed(text + '\n')
+    stream.finish()
+    return stream.result
+
+def _normalize(key, value):
+    # แปลงค่าจาก JSON ให้อยู่ในรูปแบบเดียวกับ parse_result (ข้อความ)
+    if isinstance(value, str):
+        value = value.strip()
+        return value.replace('\n', ' ') if key == 'hashtags' else value
+    items = [v.strip() for v in value if v.strip()]
+    if key == 'hashtags':
+        return ' '.join(t if t.startswith('#') else '#' + t for t in items)
+    return '\n'.join(f"- {v.lstrip('-• ').strip()}" for v in items)
+
+def parse_json_result(text):
+    # คืน dict ถ้า JSON ถูกต้องตาม schema และมีครบทุกส่วน ไม่งั้นคืน None
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    result = {}
+    for key in SECTION_KEYS:
+        value = data.get(key)
+        if not (isinstance(value, str) or isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            return None
+        result[key] = _normalize(key, value)
+    return result if all(result.values()) else None
+
+@metrics.timed('parse_response')
+def parse_response(text, structured=False):
+    # JSON ก่อน (ถ้าขอแบบ JSON) -> ไม่ผ่านค่อยใช้ parse_result; นับสถิติทุกครั้ง
+    parsed = parse_json_result(text) if structured else None
+    fell_back = structured and parsed is None
+    if parsed is None:
+        parsed = parse_result(text)
+    record_parse(parsed, structured, fell_back)
+    return parsed
+
+def record_parse(parsed, structured, fell_back):
+    counters = ['analyses']
+    if structured:
+        counters.append('analyses_json')
+    if fell_back:
+        counters.append('json_fallbacks')
+    if not all(parsed.values()):
+        counters.append('parse_failures')
+    try:
+        usage_stats.incr(*counters)
+    except Exception:  # ตัวนับห้ามทำให้การวิเคราะห์ล้ม
+        logger.exception("usage_stats failed")
+
+def analyze_url(model, url, session=None, structured=STRUCTURED_OUTPUT):
+    # แคช -> ดึงหน้า -> Gemini -> แยกส่วน คืน (page_text, parsed, cached)
+    cached = analysis_cache.get(url, PROMPT_HASH)
+    if cached:
+        page_text, parsed = cached
+        return page_text, parsed, True
+    page_text = fetch_page_text(url, session)
+    text = analyze_with_ai(model, detect_platform(url), page_text, url, structured)
+    parsed = parse_response(text, structured)
+    if any(parsed.values()):
+        analysis_cache.put(url, PROMPT_HASH, page_text, parsed)
+    return page_text, parsed, False
+
+# --- STREAMING PARSER ---
+SECTION_KEYS = ('points', 'caption', 'hashtags', 'tips')
+# regex เดียวจับได้ทุกหัวข้อ: "1.) จุดเด่น", "**2) แคปชั่น**", "### 3. Hashtag", "Hashtag แนะนำ:" ฯลฯ
+# ไม่มีเลขนำหน้าได้ถ้าบรรทัดจบด้วย ":" หรือ "**" (กันบรรทัดเนื้อหาที่บังเอิญขึ้นต้นด้วยคำเดียวกัน)
+# แต่ถ้าคำตอบใช้หัวข้อมีเลขแล้ว รับเฉพาะหัวข้อมีเลข ("แคปชั่น ที่ดี:" ในจุดเด่นไม่ใช่หัวข้อใหม่)
+# หัวข้อต้องจบบรรทัดแล้วถึงนับว่าเจอ และต้องมาตามลำดับ (ข้ามส่วนได้ ย้อนกลับไม่ได้)
+SECTION_HEADER = re.compile(
+    r'(?mi)^[ \t#*>]*(?:(?P<num>[1-4])\s*[.)]+\s*|(?=[^\n]*(?::|\*\*)[ \t]*$))\**\s*'
+    r'(?:(?P<points>จุดเด่น)|(?P<caption>แคปชั่น|แคปชัน|caption)|(?P<hashtags>hashtag|แฮชแท็ก|แฮชแทก)'
+    r'|(?P<tips>คำแนะนำ|เทคนิค))[^\n]*\n')
+
+
+class SectionStream:
+    # ป้อนข้อความทีละ chunk แล้วอ่าน result/completed ได้ตลอด — ส่วนหนึ่งถือว่าครบเมื่อหัวข้อถัดไปมาถึง
+    def __init__(self):
+        self.text = ''
+        self.keys = []      # หัวข้อที่เจอแล้วตามลำดับ
+        self.bounds = []    # [start, end] ของเนื้อหาแต่ละส่วน (end=None คือยังรับอยู่)
+        self.done = False
+        self._numbered = False   # เจอหัวข้อมีเลขแล้ว
+        self._scan = 0      # ต้นบรรทัดที่ยังไม่จบ — chunk ถัดไปสแกนต่อจากตรงนี้ ไม่สแกนซ้ำทั้งข้อความ
+
+    def feed(self, chunk):
+        self.text += chunk
+        for m in SECTION_HEADER.finditer(self.text, self._scan):
+            key = m.lastgroup
+            if m.group('num'):
+                self._numbered = True
+            elif self._numbered:
+                continue
+            if self.keys and SECTION_KEYS.index(key) <= SECTION_KEYS.index(self.keys[-1]):
+                continue
+            if self.bounds:
+                self.bounds[-1][1] = m.start()
+            self.keys.append(key)
+            self.bounds.append([m.end(), None])
+        self._scan = self.text.rfind('\n') + 1
+
+    def finish(self):
+        self.done = True
+
+    @property
+    def completed(self):
+        keys = [key for key, (_, end) in zip(self.keys, self.bounds) if end is not None]
+        if self.done and len(keys) < len(self.keys):
+            keys.append(self.keys[-1])
+        return keys
+
+    @property
+    def result(self):
+        result = dict.fromkeys(SECTION_KEYS, '')
+        for key, (start, end) in zip(self.keys, self.bounds):
+            result[key] = self.text[start:end].strip()
+        result['hashtags'] = result['hashtags'].replace('\n', ' ')
+        return result
+
+
+class JsonSectionStream(SectionStream):
+    # SectionStream สำหรับคำตอบแบบ JSON: แสดงแต่ละช่องทันทีที่ค่าของช่องนั้นปิดครบ (") หรือ (])
+    # finish() ตรวจทั้งก้อนอีกครั้ง ไม่ผ่านก็ถอยไปใช้ parse_result กับข้อความเดิม
+    FIELD = re.compile(r'"(points|caption|hashtags|tips)"\s*:\s*'
+                       r'("(?:[^"\\]|\\.)*"|\[(?:[^\]"]|"(?:[^"\\]|\\.)*")*\])')
+
+    def __init__(self):
+        super().__init__()
+        self.fields = {}
+        self.fell_back = False
+
+    def feed(self, chunk):
+        self.text += chunk
+        for m in self.FIELD.finditer(self.text, self._scan):
+            try:
+                self.fields[m.group(1)] = _normalize(m.group(1), json.loads(m.group(2)))
+            except (ValueError, AttributeError):
+                continue
+            self._scan = m.end()
+
+    def finish(self):
+        self.done = True
+        parsed = parse_json_result(self.text)
+        if parsed is None:
+            self.fell_back = True
+            parsed = parse_result(self.text)
+        self.fields = parsed
+
+    @property
+    def completed(self):
+        return [key for key in SECTION_KEYS if self.fields.get(key)]
+
+    @property
+    def result(self):
+        return {key: self.fields.get(key, '') for key in SECTION_KEYS}
+
+
+def stream_analysis(model, platform, page_text, url, structured=STRUCTURED_OUTPUT):
+    # yield SectionStream หลังทุก chunk; ตัวสุดท้ายคือผลที่ finish แล้ว
+    stream = JsonSectionStream() if structured else SectionStream()
+    t0 = time.perf_counter()
+    first_section = None
+    for text in analyze_with_ai_stream(model, platform, page_text, url, structured):
+        stream.feed(text)
+        if first_section is None and stream.completed:
+            first_section = time.perf_counter() - t0
+            logger.info("time_to_first_section_ms=%.0f platform=%s", first_section * 1000, platform)
+            if metrics.ENABLED:
+                metrics.record('gemini_first_section', first_section * 1000)
+        yield stream
+    with metrics.span('parse_stream'):
+        stream.finish()
+    full = (time.perf_counter() - t0) * 1000
+    logger.info("time_to_full_result_ms=%.0f platform=%s", full, platform)
+    if metrics.ENABLED:
+        metrics.record('gemini_stream', full)
+    record_parse(stream.result, structured, getattr(stream, 'fell_back', False))
+    yield stream
+
+def analyze_pipeline(model, url, platform, structured=STRUCTURED_OUTPUT):
+    # ขั้นตอนเต็มของการกดวิเคราะห์หนึ่งลิงก์ — หน้าเว็บรันเองตรงๆ หรือ worker.py รันแทนแล้วรายงานผ่าน job_queue
+    # yield (stage, data): ('fetch', None) -> ('ai', None) -> ('stream', ส่วนที่ได้แล้ว)... -> ('done', ผล)
+    # ผล = {'page_text', 'parsed', 'similar', 'cached'}
+    cached = analysis_cache.get(url, PROMPT_HASH)
+    if cached:
+        page_text, parsed = cached
+        yield 'done', {'page_text': page_text, 'parsed': parsed, 'similar': None, 'cached': True}
+        return
+    import near_dup   # numpy โหลดตอนวิเคราะห์ครั้งแรก ไม่ใช่ตอนเปิดหน้า
+    yield 'fetch', None
+    page_text = fetch_page_text(url)
+    # สินค้าชิ้นเดียวกันจากร้าน/ลิงก์อื่นที่วิเคราะห์ไปแล้ว -> ใช้ผลเดิม ไม่ต้องเรียก Gemini
+    similar = near_dup.find_similar(page_text, PROMPT_HASH, exclude_url=url)
+    if similar:
+        parsed = similar['parsed']
+    else:
+        yield 'ai', None
+        for stream in stream_analysis(model, platform, page_text, url, structured):
+            yield 'stream', dict(stream.result)
+        parsed = stream.result
+    if any(parsed.values()):
+        analysis_cache.put(url, PROMPT_HASH, page_text, parsed)
+        if not similar:
+            near_dup.add(url, PROMPT_HASH, page_text, parsed)
+        info = page_extract.parse_summary(page_text)
+        product_store.upsert_product(link=url, name=info.get('name'), price=info.get('price'),
+                                     platform=platform, caption=parsed['caption'], hashtags=parsed['hashtags'])
+    yield 'done', {'page_text': page_text, 'parsed': parsed, 'similar': similar, 'cached': False}
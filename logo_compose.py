@@ -0,0 +1,111 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+import metrics
+
+# ระบบแปะโลโก้แบบเป็นชั้น: ภาพพื้นหลังกับโลโก้ที่แปลงแล้วถูก cache ไว้
+# preview ย่อขนาดและวาดใหม่เฉพาะบริเวณที่โลโก้เคยอยู่ ส่วน PNG ความละเอียดเต็มสร้างตอนกดดาวน์โหลดเท่านั้น
+
+# --- CONFIG ---
+PREVIEW_SIZE = 512          # ด้านยาวของภาพ preview
+MAX_DECODED = 8             # โลโก้ที่ decode เก็บไว้
+MAX_TRANSFORMED = 64        # โลโก้ที่ย่อ/หมุนแล้วเก็บไว้ (ขนาด × มุม × scale)
+
+_lock = threading.Lock()
+_decoded = OrderedDict()
+_transformed = OrderedDict()
+
+
+def _lru_get(cache, key, make, limit):
+    with _lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    value = make()
+    with _lock:
+        cache[key] = value
+        while len(cache) > limit:
+            cache.popitem(last=False)
+    return value
+
+
+def logo_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def decode_logo(data, key=None):
+    key = key or logo_hash(data)
+    return _lru_get(_decoded, key, lambda: Image.open(BytesIO(data)).convert('RGBA'), MAX_DECODED)
+
+
+@metrics.timed('logo_transform')
+def transform_logo(data, size, rotation, scale=1.0, key=None):
+    # คณิตเดียวกับหน้าเว็บเดิม: thumbnail ให้ไม่เกิน size แล้วหมุน -rotation แบบขยายกรอบ
+    key = key or logo_hash(data)
+
+    def make():
+        logo = decode_logo(data, key).copy()
+        logo.thumbnail((size, size))
+        logo = logo.rotate(-rotation, expand=True, resample=Image.BICUBIC)
+        if scale != 1.0:
+            w, h = logo.size
+            logo = logo.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.BILINEAR)
+        return logo
+
+    return _lru_get(_transformed, (key, size, rotation, scale), make, MAX_TRANSFORMED)
+
+
+def paste_centered(canvas, logo, center):
+    # คืนกรอบ (left, top, right, bottom) ที่ถูกวาดทับ ตัดให้อยู่ในภาพแล้ว
+    w, h = logo.size
+    left, top = center[0] - w // 2, center[1] - h // 2
+    canvas.paste(logo, (left, top), logo if logo.mode in ('RGBA', 'LA') else None)
+    box = (max(0, left), max(0, top), min(canvas.width, left + w), min(canvas.height, top + h))
+    return box if box[0] < box[2] and box[1] < box[3] else None
+
+
+def compose_full(base, logo_data, size, rotation, center):
+    image = base.copy()
+    if logo_data:
+        paste_centered(image, transform_logo(logo_data, size, rotation), center)
+    return image
+
+
+@metrics.timed('png_encode')
+def encode_png(image):
+    buf = BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class Compositor:
+    # เก็บไว้ใน session_state ต่อภาพพื้นหลังหนึ่งภาพ
+    def __init__(self, base):
+        self.base = base
+        self.scale = min(1.0, PREVIEW_SIZE / max(base.size))
+        preview = base.convert('RGB')
+        if self.scale < 1.0:
+            preview = preview.resize((round(base.width * self.scale), round(base.height * self.scale)), Image.BILINEAR)
+        self.preview_base = preview
+        self.canvas = preview.copy()
+        self._dirty = None
+
+    @metrics.timed('preview_render')
+    def render_preview(self, logo_data, size, rotation, center):
+        # คืนภาพจากตัว canvas เดิม (ไม่ copy ทั้งภาพ) — คืนพื้นหลังเฉพาะกรอบเก่าแล้วแปะโลโก้ใหม่
+        if self._dirty:
+            self.canvas.paste(self.preview_base.crop(self._dirty), self._dirty[:2])
+            self._dirty = None
+        if logo_data:
+            logo = transform_logo(logo_data, size, rotation, self.scale)
+            self._dirty = paste_centered(self.canvas, logo,
+                                         (round(center[0] * self.scale), round(center[1] * self.scale)))
+        return self.canvas
+
+    def to_full(self, x, y):
+        # แปลงพิกัดบน preview กลับเป็นพิกัดบนภาพเต็ม
+        return round(x / self.scale), round(y / self.scale)
@@ -0,0 +1,182 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# วัดเวลาแต่ละขั้นตอน (span) ของทั้งสองแอป เก็บในหน่วยความจำของ process
+#   with metrics.span('fetch'): ...       หรือ  @metrics.timed('png_encode')
+# เปิดด้วย METRICS=1 — ปิดอยู่ span() คืนตัว no-op ตัวเดียวกันทุกครั้ง และ @timed คืนฟังก์ชันเดิมไม่ห่อเลย
+# ดูผล: หน้าแอดมินในแอป (?admin=<METRICS_TOKEN>) หรือตั้ง METRICS_PORT ให้เปิด /metrics (Prometheus) และ /metrics.json
+
+# --- CONFIG ---
+ENABLED = os.environ.get("METRICS", "") == "1"
+PORT = int(os.environ.get("METRICS_PORT", "0") or 0)
+HOST = os.environ.get("METRICS_HOST", "127.0.0.1")   # endpoint ไม่มีรหัสผ่าน — เปิดให้เครื่องอื่นดึงต้องตั้งเอง เช่น 0.0.0.0
+RING_SIZE = 2000        # span ล่าสุดที่เก็บไว้ดูย้อนหลัง
+# ขอบ bucket (ms) แบบ log ตั้งแต่ 0.05ms ถึง ~4 นาที — percentile ประมาณแบบเส้นตรงภายใน bucket
+BUCKETS_MS = tuple(round(0.05 * 1.25 ** i, 3) for i in range(70)) + (float('inf'),)
+
+_lock = threading.Lock()
+_recent = deque(maxlen=RING_SIZE)   # (time, stage, ms)
+_stages = {}                        # stage -> [count, sum_ms, max_ms, [count ต่อ bucket]]
+
+
+def record(stage, ms):
+    i = bisect.bisect_left(BUCKETS_MS, ms)
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = [0, 0.0, 0.0, [0] * len(BUCKETS_MS)]
+        stats[0] += 1
+        stats[1] += ms
+        if ms > stats[2]:
+            stats[2] = ms
+        stats[3][i] += 1
+        _recent.append((time.time(), stage, ms))
+
+
+class _Span:
+    __slots__ = ('stage', 't0')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+def span(stage):
+    return _Span(stage) if ENABLED else _NOOP
+
+
+def timed(stage):
+    # ตัดสินใจตอน import: ปิดอยู่ = ไม่มีค่าใช้จ่ายใดๆ ตอนเรียกฟังก์ชัน
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(stage, (time.perf_counter() - t0) * 1000)
+        return inner
+    return wrap
+
+
+def _percentile(buckets, count, q, peak):
+    target, seen, lower = q * count, 0, 0.0
+    for bound, n in zip(BUCKETS_MS, buckets):
+        if n and seen + n >= target:
+            upper = min(bound, peak)
+            return lower + (upper - lower) * (target - seen) / n
+        seen += n
+        lower = bound
+    return peak
+
+
+def snapshot():
+    # {stage: {'count', 'avg_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}
+    with _lock:
+        stages = {k: (v[0], v[1], v[2], list(v[3])) for k, v in _stages.items()}
+    out = {}
+    for stage, (count, total, peak, buckets) in sorted(stages.items()):
+        out[stage] = {'count': count, 'avg_ms': round(total / count, 3), 'max_ms': round(peak, 3)}
+        for q in (50, 95, 99):
+            out[stage][f'p{q}_ms'] = round(_percentile(buckets, count, q / 100, peak), 3)
+    return out
+
+
+def recent(limit=100):
+    with _lock:
+        items = list(_recent)[-limit:]
+    return [{'time': t, 'stage': s, 'ms': round(ms, 3)} for t, s, ms in reversed(items)]
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _recent.clear()
+
+
+def to_json():
+    return json.dumps({'enabled': ENABLED, 'stages': snapshot(), 'recent': recent()}, ensure_ascii=False, indent=2)
+
+
+def to_prometheus(prefix='sme'):
+    with _lock:
+        stages = {k: (v[0], v[1], list(v[3])) for k, v in _stages.items()}
+    name = f'{prefix}_stage_duration_seconds'
+    lines = [f'# HELP {name} Time spent per stage.', f'# TYPE {name} histogram']
+    for stage, (count, total, buckets) in sorted(stages.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS, buckets):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else f'{bound / 1000:g}'
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total / 1000:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body, kind = to_json().encode('utf-8'), 'application/json'
+        elif self.path.startswith('/metrics'):
+            body, kind = to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', kind)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_serve_tried = False
+
+
+def serve(port=PORT, host=HOST):
+    # เปิด endpoint ให้ Prometheus ดึง — ลองครั้งเดียวต่อ process (พอร์ตถูกใช้อยู่ก็ข้ามไป)
+    # สองแอปรันคนละ process ต้องตั้ง METRICS_PORT คนละค่า
+    global _server, _serve_tried
+    with _lock:
+        if _serve_tried or not port:
+            return _server
+        _serve_tried = True
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError:
+            return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,216 @@
+import json
+import re
+import threading
+import time
+
+import numpy as np
+
+import db
+from analysis_cache import CACHE_TTL, canonicalize_url
+
+# หาสินค้าที่ "เหมือนกันเกือบทุกตัวอักษร" จากข้อความหน้าเว็บ (คนละร้าน/คนละลิงก์ แต่ของชิ้นเดียวกัน)
+# MinHash บน shingle ตัวอักษร 5 ตัว (ภาษาไทยไม่มีเว้นวรรค ตัดเป็นคำไม่ได้) + LSH แบ่ง band
+# ดัชนีอยู่ในหน่วยความจำเป็น array ของ NumPy: แต่ละ band เก็บ key ที่เรียงแล้ว ค้นด้วย searchsorted
+# ข้อมูลจริง (signature + ผลวิเคราะห์) อยู่ในตาราง near_dup ของ merchant_data.db — process อื่นเพิ่มมาก็ตามทัน
+# ผลที่ใช้ซ้ำได้ต้องมาจาก prompt เดียวกัน (prompt_hash) และอายุไม่เกิน CACHE_TTL เหมือน analysis_cache
+
+# --- CONFIG ---
+SHINGLE = 5
+NUM_PERM = 64
+BANDS = 16                # 16 band × 4 แถว -> ความคล้าย 0.75 มีโอกาสหลุดจากผู้สมัครแค่ ~0.2%
+MATCH_THRESHOLD = 0.75    # สัดส่วน MinHash ที่ตรงกัน (ประมาณ Jaccard) ขั้นต่ำที่ถือว่าเป็นสินค้าเดียวกัน
+MIN_SHINGLES = 40         # ข้อความสั้นกว่านี้ (เช่นดึงหน้าไม่ได้) ไม่เอาเข้าดัชนี
+MERGE_EVERY = 2048        # แถวใหม่ค้างใน tail เกินนี้ค่อยเรียง band ใหม่ทั้งก้อน
+MAX_CANDIDATES = 20       # ตัวที่ผ่านเกณฑ์เรียงจากคล้ายสุด เอามาเช็กอายุ/prompt ในฐานข้อมูลไม่เกินเท่านี้
+MAX_ENTRIES = 50000       # เกินนี้ลบแถวเก่าสุดออก
+EVICT_EVERY = 10 * 60     # วินาที — add() ลบแถวหมดอายุ/prompt เก่าอย่างมากครั้งหนึ่งต่อช่วงนี้ต่อ process
+
+_ROWS = NUM_PERM // BANDS
+_rng = np.random.default_rng(20240601)   # seed คงที่ — signature ที่เก็บไว้ต้องเทียบกันได้ทุก process
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2 ** 63, _ROWS, dtype=np.uint64) | np.uint64(1)
+_NOISE = re.compile(r'[^0-9a-z\u0E00-\u0E7F]+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS near_dup (
+    id INTEGER PRIMARY KEY,
+    url_key TEXT UNIQUE,
+    url TEXT,
+    signature BLOB,
+    result_json TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_near_dup_created ON near_dup(created_at);
+"""
+
+
+def normalize(text):
+    return _NOISE.sub('', (text or '').lower())
+
+
+def signature(text):
+    # คืน MinHash (uint32 × NUM_PERM) หรือ None ถ้าข้อความสั้นเกินไป
+    codes = np.frombuffer(normalize(text).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE + MIN_SHINGLES:
+        return None
+    # rolling hash ของทุก shingle พร้อมกัน (ล้นเกิน 2^64 ได้ตั้งใจ)
+    n = len(codes) - SHINGLE + 1
+    h = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for j in range(SHINGLE):
+            h = h * np.uint64(1000003) + codes[j:j + n]
+        h = np.unique(h)
+        # multiply-shift hashing: เอา 32 บิตบนของ (a*h + b) mod 2^64
+        return ((np.outer(_A, h) + _B[:, None]) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def band_keys(sigs):
+    sigs = np.atleast_2d(sigs).astype(np.uint64).reshape(-1, BANDS, _ROWS)
+    with np.errstate(over='ignore'):
+        return (sigs * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+class NearDupIndex:
+    # ดัชนีในหน่วยความจำล้วน: add/lookup ด้วย id ที่ผู้เรียกกำหนด
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.sigs = np.zeros((0, NUM_PERM), dtype=np.uint32)
+        self._sorted = np.zeros((BANDS, 0), dtype=np.uint64)   # band key ที่เรียงแล้ว
+        self._order = np.zeros((BANDS, 0), dtype=np.int64)     # ตำแหน่งแถวของ key แต่ละตัว
+        self._merged = 0                                       # แถว [0, _merged) อยู่ใน _sorted แล้ว
+        self._tail_keys = np.zeros((0, BANDS), dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add_many(self, ids, sigs):
+        if not len(ids):
+            return
+        sigs = np.asarray(sigs, dtype=np.uint32).reshape(-1, NUM_PERM)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.sigs = np.concatenate([self.sigs, sigs])
+        self._tail_keys = np.concatenate([self._tail_keys, band_keys(sigs)])
+        if len(self._tail_keys) > MERGE_EVERY:
+            self._merge()
+
+    def add(self, item_id, sig):
+        self.add_many([item_id], [sig])
+
+    def _merge(self):
+        keys = band_keys(self.sigs).T
+        self._order = np.argsort(keys, axis=1, kind='stable')
+        self._sorted = np.take_along_axis(keys, self._order, axis=1)
+        self._merged = len(self.ids)
+        self._tail_keys = np.zeros((0, BANDS), dtype=np.uint64)
+
+    def candidates(self, sig):
+        keys = band_keys(sig)[0]
+        found = []
+        if self._merged:
+            lo = [np.searchsorted(self._sorted[b], keys[b], 'left') for b in range(BANDS)]
+            hi = [np.searchsorted(self._sorted[b], keys[b], 'right') for b in range(BANDS)]
+            found.extend(self._order[b, lo[b]:hi[b]] for b in range(BANDS) if hi[b] > lo[b])
+        if len(self._tail_keys):
+            hits = np.nonzero((self._tail_keys == keys).any(axis=1))[0]
+            if len(hits):
+                found.append(hits + self._merged)
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def matches(self, sig, threshold=MATCH_THRESHOLD, limit=None):
+        # คืน [(id, score)] ของทุกตัวที่ผ่านเกณฑ์ เรียงจากคล้ายสุด
+        rows = self.candidates(sig)
+        if not len(rows):
+            return []
+        scores = (self.sigs[rows] == sig).mean(axis=1)
+        keep = np.nonzero(scores >= threshold)[0]
+        keep = keep[np.argsort(-scores[keep], kind='stable')][:limit]
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in keep]
+
+    def lookup(self, sig, threshold=MATCH_THRESHOLD):
+        # คืน (id, score) ของตัวที่คล้ายที่สุดที่ผ่านเกณฑ์ หรือ None
+        found = self.matches(sig, threshold, 1)
+        return found[0] if found else None
+
+
+_lock = threading.Lock()
+_indexes = {}   # DB_PATH -> (NearDupIndex, id สุดท้ายที่โหลดแล้ว)
+_last_evict = {}   # DB_PATH -> เวลาที่ลบครั้งล่าสุด
+
+
+def ensure_schema(conn):
+    conn.executescript(_SCHEMA)
+    # ตารางเก่าไม่มี prompt_hash -> แถวเดิม (NULL) ไม่ถูกใช้อีก เพราะไม่รู้ว่ามาจาก prompt ไหน
+    if 'prompt_hash' not in {row[1] for row in conn.execute("PRAGMA table_info(near_dup)")}:
+        conn.execute("ALTER TABLE near_dup ADD COLUMN prompt_hash TEXT")
+
+
+def _index(conn):
+    # โหลดเฉพาะแถวที่เพิ่มมาใหม่ตั้งแต่ครั้งก่อน (รวมที่ process อื่นเขียน)
+    index, last_id = _indexes.get(db.DB_PATH, (None, 0))
+    if index is None:
+        index = NearDupIndex()
+    rows = conn.execute("SELECT id, signature FROM near_dup WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+    if rows:
+        index.add_many([r[0] for r in rows], np.frombuffer(b''.join(r[1] for r in rows), dtype=np.uint32))
+        last_id = rows[-1][0]
+    _indexes[db.DB_PATH] = (index, last_id)
+    return index
+
+
+def find_similar(page_text, prompt_hash, exclude_url=None, threshold=MATCH_THRESHOLD, ttl=CACHE_TTL):
+    # คืน {'url', 'score', 'parsed'} ของสินค้าที่วิเคราะห์ไปแล้ว (prompt เดียวกัน ยังไม่หมดอายุ) ที่คล้ายที่สุด หรือ None
+    sig = signature(page_text)
+    if sig is None:
+        return None
+    with _lock, db.session(schema=ensure_schema) as conn:
+        hits = dict(_index(conn).matches(sig, threshold, MAX_CANDIDATES))
+        if not hits:
+            return None
+        # ดัชนีในหน่วยความจำยังมีแถวที่ลบ/หมดอายุไปแล้ว — ตัดสินจากฐานข้อมูล
+        # ตัดลิงก์ตัวเองออกใน SQL เลย แถวที่เหลือที่คล้ายรองลงมายังใช้ได้
+        sql = ("SELECT id, url, result_json FROM near_dup WHERE id IN (" + ", ".join("?" * len(hits)) +
+               ") AND prompt_hash = ? AND created_at >= ?")
+        args = [*hits, prompt_hash, time.time() - ttl]
+        if exclude_url:
+            sql += " AND url_key != ?"
+            args.append(canonicalize_url(exclude_url))
+        rows = conn.execute(sql, args).fetchall()
+    if not rows:
+        return None
+    item_id, url, result_json = max(rows, key=lambda r: hits[r[0]])
+    return {'url': url, 'score': round(hits[item_id], 3), 'parsed': json.loads(result_json)}
+
+
+def add(url, prompt_hash, page_text, parsed):
+    # เก็บผลวิเคราะห์ไว้ให้ลิงก์อื่นที่เนื้อหาเหมือนกันใช้ต่อ (ลิงก์เดิมแทนที่แถวเก่า — ได้ id ใหม่ ดัชนีโหลดตามเอง)
+    sig = signature(page_text)
+    if sig is None:
+        return False
+    now = time.time()
+    with _lock, db.session(schema=ensure_schema) as conn:
+        conn.execute("INSERT OR REPLACE INTO near_dup (url_key, url, signature, result_json, created_at, prompt_hash) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", (canonicalize_url(url), url, sig.tobytes(),
+                                                   json.dumps(parsed, ensure_ascii=False), now, prompt_hash))
+        due = now - _last_evict.get(db.DB_PATH, 0) > EVICT_EVERY
+    if due:
+        evict(prompt_hash, now=now)
+    return True
+
+
+def evict(prompt_hash=None, ttl=CACHE_TTL, max_entries=MAX_ENTRIES, now=None):
+    # ลบแถวหมดอายุ, แถวของ prompt อื่น (ถ้าระบุ prompt_hash) และแถวเก่าสุดที่เกิน max_entries — คืนจำนวนที่ลบ
+    now = time.time() if now is None else now
+    with _lock, db.session(schema=ensure_schema) as conn:
+        _last_evict[db.DB_PATH] = now
+        removed = conn.execute("DELETE FROM near_dup WHERE created_at < ? OR prompt_hash IS NULL" +
+                               (" OR prompt_hash != ?" if prompt_hash else ""),
+                               (now - ttl, prompt_hash) if prompt_hash else (now - ttl,)).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM near_dup").fetchone()
+        if count > max_entries:
+            removed += conn.execute("DELETE FROM near_dup WHERE id IN "
+                                    "(SELECT id FROM near_dup ORDER BY created_at LIMIT ?)",
+                                    (count - max_entries,)).rowcount
+        if removed:
+            _indexes.pop(db.DB_PATH, None)   # สร้างดัชนีใหม่จากแถวที่เหลือตอนค้นครั้งถัดไป
+    return removed
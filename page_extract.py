@@ -0,0 +1,290 @@
+import codecs
+import itertools
+import json
+import re
+from collections import deque
+from html.parser import HTMLParser
+
+# ตัวดึงข้อความหน้าสินค้าแบบอ่านทีละ chunk — เลิกอ่านทันทีที่ได้ข้อมูลพอ ไม่ต้องโหลดทั้งหน้าแล้วสร้าง DOM เต็ม
+# ใช้ lxml (เร็วกว่า, เขียนด้วย C) ถ้ามีติดตั้ง ไม่งั้นใช้ html.parser ของ Python
+# lxml import ตอนแยกหน้าแรก ไม่ใช่ตอน import โมดูลนี้ (krobjang.py เปิดหน้าได้โดยไม่ต้องโหลด lxml)
+
+_etree = False   # False = ยังไม่ได้ลอง import, None = ไม่มี lxml
+
+# --- CONFIG ---
+TEXT_LIMIT = 3000            # ตัวอักษรที่ส่งให้ AI
+CHUNK_SIZE = 16 * 1024
+SOFT_BYTES = 512 * 1024      # ได้ข้อความพอแล้วแต่ยังไม่เจอ structured data -> อ่านต่อได้ถึงเท่านี้
+MAX_BYTES = 3 * 1024 * 1024  # ไม่อ่านเกินนี้ไม่ว่ากรณีใด
+MAX_SCRIPT_CHARS = 400_000   # state JSON ใหญ่กว่านี้ไม่ parse
+
+SKIP_TAGS = {'script', 'style', 'nav', 'footer', 'header', 'noscript', 'svg', 'template', 'iframe'}
+STATE_SCRIPT_IDS = {'__NEXT_DATA__', '__UNIVERSAL_DATA_FOR_REHYDRATION__', 'SIGI_STATE', '__NUXT_DATA__'}
+STATE_PREFIX = re.compile(r'^\s*(?:window\.)?(?:__INITIAL_STATE__|__PRELOADED_STATE__|__moduleData__|pageData)\s*=')
+# <meta charset="..."> หรือ <meta http-equiv="Content-Type" content="...; charset=..."> ใน 1024 ไบต์แรก (ตามสเปก HTML)
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.I)
+META_KEYS = {'og:title': 'name', 'og:description': 'description', 'description': 'description',
+             'product:price:amount': 'price', 'og:price:amount': 'price', 'product:brand': 'brand'}
+
+
+class _Collector:
+    # รับ event แบบ start/end/data (อินเทอร์เฟซ parser target ของ lxml) — ใช้ได้กับทั้งสอง backend
+    def __init__(self):
+        self.product = {}
+        self.parts = []
+        self.text_len = 0
+        self.title = ''
+        self._skip = 0
+        self._script = None     # 'ld' / 'state' / None ขณะอยู่ใน <script>
+        self._script_buf = []
+        self._script_len = 0
+        self._in_title = False
+        self._text = []         # ข้อความต่อเนื่องที่ยังไม่เจอแท็กคั่น (parser อาจตัดกลางคำตรงรอยต่อ chunk)
+        self._text_len = 0
+
+    @property
+    def has_structured(self):
+        return 'name' in self.product and ('price' in self.product or 'description' in self.product)
+
+    def start(self, tag, attrib):
+        self.flush()
+        tag = tag.lower()
+        if tag == 'meta':
+            key = (attrib.get('property') or attrib.get('name') or '').lower()
+            field = META_KEYS.get(key)
+            if field and attrib.get('content') and field not in self.product:
+                self.product[field] = attrib['content'].strip()
+            return
+        if tag == 'title':
+            self._in_title = True
+        if tag == 'script':
+            kind = (attrib.get('type') or '').lower()
+            if kind == 'application/ld+json':
+                self._script = 'ld'
+            elif attrib.get('id') in STATE_SCRIPT_IDS or kind == 'application/json' or not attrib.get('src'):
+                self._script = 'state'
+            self._script_buf = []
+            self._script_len = 0
+        if tag in SKIP_TAGS:
+            self._skip += 1
+
+    def end(self, tag):
+        self.flush()
+        tag = tag.lower()
+        if tag == 'title':
+            self._in_title = False
+        if tag == 'script' and self._script:
+            self._handle_script(self._script, ''.join(self._script_buf))
+            self._script = None
+            self._script_buf = []
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def data(self, data):
+        if self._script:
+            if self._script_len < MAX_SCRIPT_CHARS:
+                self._script_buf.append(data)
+                self._script_len += len(data)
+            return
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip or self.text_len + self._text_len >= TEXT_LIMIT:
+            return
+        self._text.append(data)
+        self._text_len += len(data)
+
+    def flush(self):
+        # รวมข้อความที่ค้างไว้เป็น part เดียว — ภาษาไทยไม่มีเว้นวรรคคั่นคำ ห้ามเติมช่องว่างตรงรอยต่อ chunk
+        if not self._text:
+            return
+        text = ' '.join(''.join(self._text).split())
+        self._text = []
+        self._text_len = 0
+        if text:
+            self.parts.append(text)
+            self.text_len += len(text) + 1
+
+    def close(self):
+        self.flush()
+        return self
+
+    def _handle_script(self, kind, raw):
+        if kind == 'ld':
+            try:
+                found = _find_product(json.loads(raw))
+            except ValueError:
+                return
+        else:
+            if len(raw) >= MAX_SCRIPT_CHARS:
+                return
+            m = STATE_PREFIX.match(raw)
+            start = m.end() if m else 0
+            if not m and not raw.lstrip().startswith(('{', '[')):
+                return
+            try:
+                obj, _ = json.JSONDecoder().raw_decode(raw[start:].lstrip())
+            except ValueError:
+                return
+            found = _find_product(obj)
+        for k, v in found.items():
+            self.product.setdefault(k, v)
+
+
+def _find_product(obj, budget=5000):
+    # BFS หา dict ที่หน้าตาเหมือนสินค้า (มีชื่อ + ราคา/รายละเอียด) ใน JSON-LD หรือ state ของหน้าเว็บ
+    queue = deque([obj])
+    while queue and budget:
+        node = queue.popleft()
+        budget -= 1
+        if isinstance(node, list):
+            queue.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        name = node.get('name') or node.get('title')
+        offers = node.get('offers')
+        if isinstance(offers, list) and offers:
+            offers = offers[0]
+        price = node.get('price') or node.get('priceShow') or node.get('price_min')
+        if price is None and isinstance(offers, dict):
+            price = offers.get('price') or offers.get('lowPrice')
+        desc = node.get('description') or node.get('desc')
+        if isinstance(name, str) and (price is not None or isinstance(desc, str)):
+            found = {'name': name.strip()}
+            if price is not None:
+                found['price'] = str(price)
+            if isinstance(desc, str):
+                found['description'] = desc.strip()
+            brand = node.get('brand')
+            if isinstance(brand, dict):
+                brand = brand.get('name')
+            if isinstance(brand, str):
+                found['brand'] = brand
+            rating = node.get('aggregateRating')
+            if isinstance(rating, dict) and rating.get('ratingValue'):
+                found['rating'] = str(rating['ratingValue'])
+            return found
+        queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+    return {}
+
+
+class _StdlibFeeder(HTMLParser):
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {k: v or '' for k, v in attrs})
+        if tag == 'meta':
+            self.target.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {k: v or '' for k, v in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag != 'meta':
+            self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def _lxml():
+    global _etree
+    if _etree is False:
+        try:
+            from lxml import etree as _etree
+        except ImportError:
+            _etree = None
+    return _etree
+
+
+def _make_feeder(collector, encoding):
+    etree = _lxml()
+    if etree is not None:
+        return etree.HTMLParser(target=collector, recover=True, encoding=encoding or 'utf-8')
+    return _StdlibFeeder(collector)
+
+
+def summarize(collector):
+    collector.flush()
+    product = collector.product
+    lines = []
+    name = product.get('name') or collector.title.strip()
+    if name:
+        lines.append(f"ชื่อสินค้า: {name}")
+    for key, label in (('brand', 'แบรนด์'), ('price', 'ราคา'), ('rating', 'คะแนนรีวิว'), ('description', 'รายละเอียด')):
+        if product.get(key):
+            lines.append(f"{label}: {product[key]}")
+    lines.append(' '.join(collector.parts))
+    return '\n'.join(lines).strip()[:TEXT_LIMIT]
+
+
+def parse_summary(text):
+    # อ่านกลับจากข้อความที่ summarize() สร้าง -> {'name', 'price', ...} (ใช้ตอนบันทึกลงตาราง products)
+    info = {}
+    labels = {'ชื่อสินค้า': 'name', 'แบรนด์': 'brand', 'ราคา': 'price', 'คะแนนรีวิว': 'rating'}
+    for line in (text or '').split('\n')[:5]:
+        label, sep, value = line.partition(': ')
+        if sep and label in labels:
+            info[labels[label]] = value.strip()
+    if 'price' in info:
+        try:
+            info['price'] = float(re.sub(r'[^\d.]', '', info['price']))
+        except ValueError:
+            del info['price']
+    return info
+
+
+def sniff_charset(head):
+    # หา charset จาก <meta> ในส่วนต้นของหน้า — ไม่เจอหรือชื่อ codec ไม่รู้จักคืน None
+    m = META_CHARSET.search(head[:1024])
+    if not m:
+        return None
+    try:
+        return codecs.lookup(m.group(1).decode('ascii')).name
+    except LookupError:
+        return None
+
+
+def extract_chunks(chunks, encoding=None):
+    # chunks = bytes ทีละก้อน (เช่น response.iter_content) คืน (text, product, bytes_read)
+    # ไม่ระบุ encoding -> ดู <meta charset> ใน chunk แรก (หน้าไทยเก่าๆ ยังเป็น TIS-620) ไม่เจอถือเป็น utf-8
+    if encoding is None:
+        chunks = iter(chunks)
+        head = []
+        for chunk in chunks:
+            head.append(chunk)
+            if sum(map(len, head)) >= 1024:
+                break
+        encoding = sniff_charset(b''.join(head))
+        chunks = itertools.chain(head, chunks)
+    collector = _Collector()
+    feeder = _make_feeder(collector, encoding)
+    decode = isinstance(feeder, _StdlibFeeder)   # lxml รับ bytes ตรงๆ, html.parser ต้องเป็น str
+    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    bytes_read = 0
+    for chunk in chunks:
+        bytes_read += len(chunk)
+        feeder.feed(decoder.decode(chunk) if decode else chunk)
+        if collector.text_len >= TEXT_LIMIT and (collector.has_structured or bytes_read >= SOFT_BYTES):
+            break
+        if bytes_read >= MAX_BYTES:
+            break
+    try:
+        feeder.close()
+    except Exception:
+        pass
+    return summarize(collector) or None, collector.product, bytes_read
+
+
+def extract_response(res):
+    # อ่านจาก requests response ที่เปิดด้วย stream=True แล้วปิด connection ทันทีที่พอ
+    # requests เดา ISO-8859-1 เมื่อ header ไม่บอก charset ซึ่งทำภาษาไทยเพี้ยน — กรณีนั้นให้ extract_chunks ดูจาก <meta>
+    encoding = res.encoding if 'charset' in res.headers.get('content-type', '').lower() else None
+    try:
+        return extract_chunks(res.iter_content(CHUNK_SIZE), encoding)
+    finally:
+        res.close()
@@ -0,0 +1,51 @@
+import streamlit as st
+
+import product_store
+
+# หน้าเรียกดูสินค้าใน merchant_data.db — streamlit run product_browser.py
+
+st.set_page_config(page_title="คลังสินค้า — Merchant Data", page_icon="📦", layout="wide")
+
+if 'browse_cursors' not in st.session_state:
+    st.session_state.browse_cursors = [0]   # id สุดท้ายของหน้าก่อนๆ (keyset pagination)
+
+st.title("📦 คลังสินค้า")
+
+c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+query = c1.text_input("ค้นหาชื่อสินค้า / แคปชั่น:", placeholder="เช่น สบู่ขมิ้น")
+platform = c2.selectbox("แพลตฟอร์ม:", ["ทั้งหมด"] + product_store.platforms())
+category = c3.selectbox("หมวด:", ["ทั้งหมด"] + product_store.categories())
+page_size = c4.selectbox("ต่อหน้า:", [25, 50, 100], index=1)
+platform = None if platform == "ทั้งหมด" else platform
+category = None if category == "ทั้งหมด" else category
+
+# เปลี่ยนตัวกรองเมื่อไหร่ กลับไปหน้าแรก
+filters = (query, platform, category, page_size)
+if st.session_state.get('browse_filters') != filters:
+    st.session_state.browse_filters = filters
+    st.session_state.browse_cursors = [0]
+
+if query.strip():
+    rows = product_store.search(query, limit=page_size, category=category, platform=platform)
+    st.caption(f"พบ {len(rows)} รายการ (แสดงสูงสุด {page_size})")
+else:
+    rows = product_store.page(st.session_state.browse_cursors[-1], page_size, category, platform=platform)
+    st.caption(f"ทั้งหมด {product_store.count(category, platform):,} รายการ · หน้า {len(st.session_state.browse_cursors)}")
+
+if rows:
+    st.dataframe(
+        [{k: r[k] for k in ('id', 'name', 'price', 'platform', 'category', 'caption', 'link')} for r in rows],
+        use_container_width=True, hide_index=True,
+        column_config={"link": st.column_config.LinkColumn("link")},
+    )
+else:
+    st.info("ไม่พบสินค้า")
+
+if not query.strip():
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("⬅️ ก่อนหน้า", disabled=len(st.session_state.browse_cursors) == 1, use_container_width=True):
+        st.session_state.browse_cursors.pop()
+        st.rerun()
+    if next_col.button("ถัดไป ➡️", disabled=len(rows) < page_size, use_container_width=True):
+        st.session_state.browse_cursors.append(rows[-1]['id'])
+        st.rerun()
@@ -0,0 +1,227 @@
+import sqlite3
+import time
+
+import db
+from analysis_cache import canonicalize_url
+
+# ชั้นเข้าถึงข้อมูลของตาราง products ใน merchant_data.db
+# ลิงก์ถูกเก็บแบบ canonical ใน link_key (unique) — ลิงก์เดียวกันที่ต่าง tracking param จะ upsert ทับแถวเดิม
+# ค้นหาชื่อสินค้า/แคปชั่นด้วย FTS5 แบบ trigram (ภาษาไทยไม่มีเว้นวรรค ตัดคำแบบ unicode61 ไม่ได้)
+
+# --- CONFIG ---
+BATCH_SIZE = 1000
+PAGE_SIZE = 50
+
+_COLUMNS = {'link_key': 'TEXT', 'platform': 'TEXT', 'caption': 'TEXT', 'hashtags': 'TEXT', 'updated_at': 'REAL'}
+# แพลตฟอร์มที่เคยถูกเขียนลง category (ก่อนมีคอลัมน์ platform) — ย้ายไปคอลัมน์ใหม่ตอน migrate
+PLATFORMS = ('TikTok', 'Shopee', 'Lazada')
+
+_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_link_key ON products(link_key);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+CREATE INDEX IF NOT EXISTS idx_products_category_price ON products(category, price);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
+CREATE INDEX IF NOT EXISTS idx_products_platform ON products(platform);
+"""
+
+_FTS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts(rowid, name, caption) VALUES (new.id, new.name, new.caption);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts(products_fts, rowid, name, caption) VALUES ('delete', old.id, old.name, old.caption);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, caption ON products BEGIN
+    INSERT INTO products_fts(products_fts, rowid, name, caption) VALUES ('delete', old.id, old.name, old.caption);
+    INSERT INTO products_fts(rowid, name, caption) VALUES (new.id, new.name, new.caption);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO products (name, price, link, link_key, platform, category, caption, hashtags, updated_at)
+VALUES (:name, :price, :link, :link_key, :platform, :category, :caption, :hashtags, :updated_at)
+ON CONFLICT(link_key) DO UPDATE SET
+    name = coalesce(excluded.name, name),
+    price = coalesce(excluded.price, price),
+    link = excluded.link,
+    platform = coalesce(excluded.platform, platform),
+    category = coalesce(excluded.category, category),
+    caption = coalesce(excluded.caption, caption),
+    hashtags = coalesce(excluded.hashtags, hashtags),
+    updated_at = excluded.updated_at
+"""
+
+_SELECT = "SELECT id, name, price, link, platform, category, caption, hashtags, updated_at FROM products"
+_SELECT_P = ("SELECT p.id, p.name, p.price, p.link, p.platform, p.category, p.caption, p.hashtags, p.updated_at "
+             "FROM products p JOIN products_fts f ON f.rowid = p.id")
+_FIELDS = ('id', 'name', 'price', 'link', 'platform', 'category', 'caption', 'hashtags', 'updated_at')
+
+
+def ensure_schema(conn):
+    # migrate ตาราง products เดิม (name, price, link, category) — รันครั้งเดียวต่อ process ต่อไฟล์
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+    if not existing:
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, price REAL, "
+                     "link TEXT, category TEXT)")
+        existing = {'id', 'name', 'price', 'link', 'category'}
+    for column, kind in _COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE products ADD COLUMN {column} {kind}")
+    if 'platform' not in existing:
+        conn.execute("UPDATE products SET platform = category, category = NULL WHERE category IN (?, ?, ?)",
+                     PLATFORMS)
+    _backfill_link_keys(conn)
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone()
+    if not has_fts:
+        try:
+            conn.execute("CREATE VIRTUAL TABLE products_fts USING fts5(name, caption, content='products', "
+                         "content_rowid='id', tokenize='trigram')")
+        except sqlite3.OperationalError:  # SQLite < 3.34 ไม่มี trigram
+            conn.execute("CREATE VIRTUAL TABLE products_fts USING fts5(name, caption, content='products', "
+                         "content_rowid='id')")
+        conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+    conn.executescript(_FTS_TRIGGERS)
+
+
+def _backfill_link_keys(conn):
+    # ต้องมี unique index ก่อนเติม link_key — UPDATE OR IGNORE ถึงจะข้ามลิงก์ที่ซ้ำกันหลังทำ canonical ได้
+    # (ไฟล์ที่ migrate ค้างครึ่งทางอาจมี link_key ซ้ำอยู่แล้ว: เก็บแถว id น้อยสุด แถวอื่นกลับเป็น NULL ก่อนสร้าง index)
+    has_unique = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_products_link_key'").fetchone()
+    if not has_unique:
+        conn.execute("UPDATE products SET link_key = NULL WHERE link_key IS NOT NULL AND id NOT IN "
+                     "(SELECT MIN(id) FROM products WHERE link_key IS NOT NULL GROUP BY link_key)")
+    conn.executescript(_INDEXES)
+    rows = conn.execute("SELECT id, link FROM products WHERE link_key IS NULL AND link IS NOT NULL").fetchall()
+    if rows:
+        # ลิงก์ซ้ำกันหลังทำ canonical -> แถวหลังคง link_key เป็น NULL
+        conn.executemany("UPDATE OR IGNORE products SET link_key = ? WHERE id = ?",
+                         [(canonicalize_url(link), pid) for pid, link in rows])
+
+
+def _row(values):
+    return dict(zip(_FIELDS, values))
+
+
+def upsert_products(rows, batch_size=BATCH_SIZE):
+    # rows = iterable ของ dict (name, price, link, platform, category, caption, hashtags) — เขียนเป็นก้อนละ batch_size
+    total = 0
+    batch = []
+    now = time.time()
+
+    def flush():
+        with db.session(schema=ensure_schema) as conn:
+            conn.executemany(_UPSERT, batch)
+
+    for row in rows:
+        batch.append({
+            'name': row.get('name') or None,
+            'price': row.get('price'),
+            'link': row['link'],
+            'link_key': canonicalize_url(row['link']),
+            'platform': row.get('platform') or None,
+            'category': row.get('category') or None,
+            'caption': row.get('caption') or None,
+            'hashtags': row.get('hashtags') or None,
+            'updated_at': row.get('updated_at') or now,
+        })
+        if len(batch) >= batch_size:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    return total
+
+
+def upsert_product(**row):
+    return upsert_products([row])
+
+
+def get_by_link(link):
+    with db.session(schema=ensure_schema) as conn:
+        values = conn.execute(_SELECT + " WHERE link_key = ?", (canonicalize_url(link),)).fetchone()
+    return _row(values) if values else None
+
+
+def count(category=None, platform=None):
+    where, args = _filters(category, None, None, platform)
+    with db.session(schema=ensure_schema) as conn:
+        return conn.execute("SELECT COUNT(*) FROM products" + (" WHERE " + " AND ".join(where) if where else ""),
+                            args).fetchone()[0]
+
+
+def _distinct(column):
+    with db.session(schema=ensure_schema) as conn:
+        return [c for (c,) in conn.execute(f"SELECT DISTINCT {column} FROM products WHERE {column} IS NOT NULL "
+                                           f"ORDER BY {column}")]
+
+
+def categories():
+    return _distinct('category')
+
+
+def platforms():
+    return _distinct('platform')
+
+
+def _filters(category, min_price, max_price, platform=None):
+    where, args = [], []
+    if category:
+        where.append("category = ?")
+        args.append(category)
+    if platform:
+        where.append("platform = ?")
+        args.append(platform)
+    if min_price is not None:
+        where.append("price >= ?")
+        args.append(min_price)
+    if max_price is not None:
+        where.append("price <= ?")
+        args.append(max_price)
+    return where, args
+
+
+def page(after_id=0, limit=PAGE_SIZE, category=None, min_price=None, max_price=None, platform=None):
+    # keyset pagination (WHERE id > ?) — เร็วเท่ากันทุกหน้า ไม่ต้อง OFFSET ข้ามแถว
+    where, args = _filters(category, min_price, max_price, platform)
+    where.insert(0, "id > ?")
+    args.insert(0, after_id)
+    with db.session(schema=ensure_schema) as conn:
+        rows = conn.execute(_SELECT + " WHERE " + " AND ".join(where) + " ORDER BY id LIMIT ?",
+                            args + [limit]).fetchall()
+    return [_row(r) for r in rows]
+
+
+def iter_products(category=None, min_price=None, max_price=None, page_size=BATCH_SIZE, platform=None):
+    # อ่านทีละหน้าแบบ lazy — ไม่ดึงทั้งตารางขึ้นหน่วยความจำ
+    after_id = 0
+    while True:
+        rows = page(after_id, page_size, category, min_price, max_price, platform)
+        if not rows:
+            return
+        yield from rows
+        after_id = rows[-1]['id']
+
+
+def _fts_query(text):
+    # ค้นแบบวลี (ครอบด้วย "...") กันตัวอักษรพิเศษของ FTS5
+    return '"' + text.replace('"', '""') + '"'
+
+
+def search(text, limit=PAGE_SIZE, category=None, platform=None):
+    text = text.strip()
+    if not text:
+        return []
+    where, args = _filters(category, None, None, platform)
+    extra = (" AND " + " AND ".join("p." + w for w in where)) if where else ""
+    with db.session(schema=ensure_schema) as conn:
+        if len(text) >= 3:
+            # เรียงใหม่สุดก่อนตาม rowid — FTS5 หยุดได้ทันทีที่ครบ LIMIT (ORDER BY rank ต้องให้คะแนนทุกแถวที่ตรง)
+            rows = conn.execute(_SELECT_P + " WHERE products_fts MATCH ?" + extra + " ORDER BY f.rowid DESC LIMIT ?",
+                                [_fts_query(text)] + args + [limit]).fetchall()
+        else:
+            # trigram ต้องมีอย่างน้อย 3 ตัวอักษร — คำสั้นกว่านั้นใช้ LIKE แทน
+            rows = conn.execute(_SELECT + " WHERE (name LIKE ? OR caption LIKE ?)" + extra.replace("p.", "") +
+                                " ORDER BY id DESC LIMIT ?", [f"%{text}%", f"%{text}%"] + args + [limit]).fetchall()
+    return [_row(r) for r in rows]
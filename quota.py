@@ -0,0 +1,130 @@
+import hashlib
+import math
+import os
+import time
+
+import streamlit as st
+
+import db
+
+# โควต้า/rate limit ฝั่ง server แบบ token bucket เก็บในตาราง quota_buckets ของ merchant_data.db
+# ทุก worker/process เห็นถังเดียวกัน — รีเฟรชหน้าเว็บหรือเปิดหลายแท็บก็ไม่ได้โควต้าใหม่
+# หนึ่งคำขออาจหักหลายถังพร้อมกัน (เช่น โควต้ารายวัน + rate ต่อนาที) ใน transaction เดียว (BEGIN IMMEDIATE)
+# ถ้าถังไหนไม่พอ จะไม่หักถังไหนเลย
+
+# --- CONFIG ---
+FREE_LIMIT = 5                  # ผู้ใช้ฟรี: วิเคราะห์ได้ 5 ลิงก์/วัน ต่อ IP (คืนทีละนิดตลอดวัน)
+FREE_WINDOW = 24 * 60 * 60
+RATE_BURST = 10                 # ทุก IP: กดติดกันได้สูงสุด 10 ครั้ง แล้วเหลือ 20 ครั้ง/นาที
+RATE_PER_MINUTE = 20
+PRO_BURST = 30                  # License Pro: ไม่จำกัดรายวัน แต่กันยิงรัวที่ 60 ครั้ง/นาที
+PRO_PER_MINUTE = 60
+# จำนวน reverse proxy ของเราเองที่อยู่หน้าแอป (ต่อ X-Forwarded-For ทีละตัว) — 0 = ไม่เชื่อ X-Forwarded-For เลย
+# เพราะ client ใส่ค่าอะไรมาก็ได้ (สุ่มใหม่ทุกคำขอ = ได้ถังโควต้าใหม่ทุกครั้ง)
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", "0") or 0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_UPSERT = ("INSERT INTO quota_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+           "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at")
+
+
+def _level(conn, key, capacity, per_second, now):
+    row = conn.execute("SELECT tokens, updated_at FROM quota_buckets WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return float(capacity)
+    return min(float(capacity), row[0] + max(0.0, now - row[1]) * per_second)
+
+
+def client_key(ip):
+    # ไม่เก็บ IP ตรงๆ ในฐานข้อมูล
+    return hashlib.sha256(ip.encode('utf-8')).hexdigest()[:16]
+
+
+def forwarded_ip(header, trusted=TRUSTED_PROXIES):
+    # proxy แต่ละตัวต่อ IP ที่ตัวเองเห็นไว้ท้ายสุด -> ตัวที่ N จากขวาคือ IP ที่ proxy ตัวนอกสุดของเราเห็น
+    # ค่าทางซ้ายของนั้น client เขียนเองได้ ไม่ใช้
+    hops = [h.strip() for h in (header or '').split(',') if h.strip()]
+    if not trusted or not hops:
+        return ''
+    return hops[-min(trusted, len(hops))]
+
+
+def client_id():
+    # IP ที่ Streamlit เห็น (หรือจาก X-Forwarded-For ถ้าตั้ง TRUSTED_PROXIES) -> 'local'
+    ip = st.context.ip_address
+    ip = forwarded_ip(st.context.headers.get('X-Forwarded-For')) or (ip if isinstance(ip, str) else '')
+    return client_key(ip or 'local')
+
+
+def buckets(client, license_hash=None, analyses=1):
+    # [(key, capacity, เติมต่อวินาที, จำนวนที่หัก)]
+    if license_hash:
+        return [(f"pro:{license_hash[:16]}", PRO_BURST, PRO_PER_MINUTE / 60, 1)]
+    return [(f"free:{client}", FREE_LIMIT, FREE_LIMIT / FREE_WINDOW, analyses),
+            (f"rate:{client}", RATE_BURST, RATE_PER_MINUTE / 60, 1)]
+
+
+def take(bucket_list, now=None):
+    # คืน (ok, รอกี่วินาทีถึงจะพอ, ชื่อถังที่ไม่พอ) — หักทุกถังหรือไม่หักเลย
+    now = time.time() if now is None else now
+    with db.immediate(schema=_SCHEMA) as conn:
+        levels = [_level(conn, key, capacity, rate, now) for key, capacity, rate, _ in bucket_list]
+        for (key, capacity, rate, cost), level in zip(bucket_list, levels):
+            if level < cost:
+                wait = (cost - level) / rate if rate and cost <= capacity else math.inf
+                return False, wait, key.split(':', 1)[0]
+        conn.executemany(_UPSERT, [(key, level - cost, now)
+                                   for (key, _, _, cost), level in zip(bucket_list, levels)])
+    return True, 0.0, None
+
+
+def refund(bucket, amount, now=None):
+    # คืนโควต้าให้งานที่ล้มเหลว (ไม่เกินความจุถัง)
+    key, capacity, rate, _ = bucket
+    now = time.time() if now is None else now
+    with db.immediate(schema=_SCHEMA) as conn:
+        level = _level(conn, key, capacity, rate, now)
+        conn.execute(_UPSERT, (key, min(float(capacity), level + amount), now))
+
+
+def remaining(client, now=None):
+    # โควต้าฟรีที่เหลือ (ปัดลง) — อ่านอย่างเดียว ไม่หัก
+    key, capacity, rate, _ = buckets(client)[0]
+    now = time.time() if now is None else now
+    return int(_level(db.ensure_schema(_SCHEMA), key, capacity, rate, now))
+
+
+# --- LICENSE ---
+def hash_key(key):
+    return hashlib.sha256(key.strip().encode('utf-8')).hexdigest()
+
+
+def _secret(name):
+    try:
+        return st.secrets.get(name, "") or ""
+    except Exception:  # ไม่มี secrets.toml (เช่นรันจาก CLI/โหลดเทสต์)
+        return os.environ.get(name, "")
+
+
+@st.cache_resource
+def license_hashes():
+    # คำนวณ set ครั้งเดียวต่อ process — LICENSE_KEYS (คีย์ตรงๆ) และ/หรือ LICENSE_KEY_HASHES (sha256 hex)
+    # แก้ secrets แล้วต้องรีสตาร์ตแอป (หรือ license_hashes.clear())
+    keys = {hash_key(k) for k in _secret("LICENSE_KEYS").split(",") if k.strip()}
+    keys.update(h.strip().lower() for h in _secret("LICENSE_KEY_HASHES").split(",") if h.strip())
+    return frozenset(keys)
+
+
+def verify_license(key):
+    # คืน hash ของคีย์ถ้าถูกต้อง ไม่งั้นคืน None
+    if not key.strip():
+        return None
+    digest = hash_key(key)
+    return digest if digest in license_hashes() else None
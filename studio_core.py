@@ -0,0 +1,89 @@
+import os
+import random
+from io import BytesIO
+
+import streamlit as st
+
+import http_client
+import image_cache
+import job_queue
+import metrics
+from translator import get_translator
+
+# ตรรกะสร้างภาพของ SME Pro Studio ที่ใช้ร่วมกันระหว่างหน้าเว็บ (app.py) กับงานเบื้องหลัง
+
+# เปิด prefetch ด้วย STUDIO_PREFETCH=1 (สร้างภาพรอไว้ต่อธีม/สินค้ายอดนิยม — ใช้โควต้า pollinations เพิ่ม)
+PREFETCH_ENABLED = os.environ.get("STUDIO_PREFETCH", "") == "1"
+
+THEMES = {
+    "✨ หรูหรา (Luxury)": "placed on a black marble table, golden lighting, elegant atmosphere",
+    "🌿 ธรรมชาติ (Organic)": "placed on a natural stone, surrounded by green leaves, soft sunlight",
+    "⚪ มินิมอล (Minimal)": "placed on a clean white podium, soft pastel background, studio lighting",
+    "🏙️ นีออน (Cyberpunk)": "neon lights background, blue and pink lighting, futuristic product shot"
+}
+
+LOCAL_DICT = {"สบู่": "soap bar", "ครีม": "cream jar", "เซรั่ม": "serum bottle", "น้ำหอม": "perfume bottle"}
+
+def create_pro_prompt(product_input, theme_key):
+    # แปลทุกคำในรอบเดียว (LOCAL_DICT + vocab_th_en.tsv, จับคำยาวสุดก่อน)
+    product_eng = get_translator(LOCAL_DICT).translate(product_input)
+    lowered = product_eng.lower()
+
+    # Geometry Lock (ล็อกทรงสบู่)
+    shape_fix = ""
+    if "soap" in lowered:
+        shape_fix = ", rectangular cuboid shape, sharp straight edges, symmetrical perspective, product packaging mockup, front view"
+    elif "box" in lowered or "กล่อง" in product_input:
+         shape_fix = ", rectangular box, sharp corners, straight lines, packaging mockup"
+
+    theme_prompt = THEMES[theme_key]
+    full_prompt = f"Professional product photography of {product_eng}{shape_fix}, {theme_prompt}, blank product surface, no text, no label, 8k resolution, telephoto lens, architectural symmetry"
+    return full_prompt
+
+def load_image_from_url(url):
+    from PIL import Image
+    # ผ่าน session กลาง: มี timeout + retry ไม่ค้างทั้ง worker ถ้า pollinations.ai ไม่ตอบ
+    data = http_client.get_content(url, conditional=False, timeout=(http_client.CONNECT_TIMEOUT, 60))
+    img = Image.open(BytesIO(data))
+    return img
+
+def _decode(data):
+    from PIL import Image
+    with metrics.span('image_decode'):
+        image = Image.open(BytesIO(data))
+        image.load()
+    return image
+
+def new_scene_image(prompt):
+    # คืน (seed, PIL Image) — ใช้ภาพที่ prefetch ไว้ถ้ามี ไม่งั้นสุ่ม seed แล้วโหลด (ผ่านแคชดิสก์)
+    hit = get_prefetcher().take(prompt) if PREFETCH_ENABLED else None
+    if hit:
+        seed, data = hit
+    else:
+        seed = random.randint(1, 999999)
+        data = image_cache.fetch(prompt, seed)
+    return seed, _decode(data)
+
+def submit_scene(prompt):
+    # มี worker อยู่ -> ส่งงานสร้างภาพเข้าคิว คืน job id; ไม่มี worker (หรือเปิด prefetch ไว้) คืน None = สร้างเองในหน้า
+    if PREFETCH_ENABLED or not job_queue.workers_alive():
+        return None
+    return job_queue.submit('scene', {'prompt': prompt})
+
+def scene_from_job(job_id, prompt):
+    # รอ worker สร้างเสร็จ แล้วเปิดภาพจากแคชดิสก์ที่ worker เขียนไว้ (ไฟล์หาย = โหลดซ้ำด้วย seed เดิม)
+    ok, result = job_queue.wait(job_id)
+    if not ok:
+        raise RuntimeError(result)
+    data = image_cache.get(result['key']) or image_cache.fetch(prompt, result['seed'])
+    return result['seed'], _decode(data)
+
+def warm_prompts():
+    # prompt ที่คนใช้บ่อย: ทุกธีม × สินค้าใน LOCAL_DICT
+    return [create_pro_prompt(thai, theme) for theme in THEMES for thai in LOCAL_DICT]
+
+@st.cache_resource
+def get_prefetcher():
+    pool = image_cache.PrefetchPool()
+    pool.warm(warm_prompts())
+    return pool
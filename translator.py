@@ -0,0 +1,50 @@
+import functools
+import os
+import re
+
+# แปลชื่อสินค้าไทย -> อังกฤษแบบรอบเดียว: รวมทุกคำในพจนานุกรมเป็น regex alternation ตัวเดียว
+# เรียงคำยาวก่อน จึงได้ longest match เสมอ ("ครีมกันแดด" ไม่ถูกแปลเป็น "cream jar" + "กันแดด")
+
+VOCAB_PATH = os.environ.get("VOCAB_PATH",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocab_th_en.tsv"))
+
+
+def load_vocab(path=VOCAB_PATH):
+    vocab = {}
+    if not os.path.exists(path):
+        return vocab
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            thai, sep, eng = line.partition("\t")
+            if sep and thai.strip() and eng.strip():
+                vocab[thai.strip()] = eng.strip()
+    return vocab
+
+
+class Translator:
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+        keys = sorted(self.mapping, key=len, reverse=True)
+        self.pattern = re.compile("|".join(map(re.escape, keys))) if keys else None
+
+    def _replace(self, match):
+        return f" {self.mapping[match.group(0)]} "
+
+    def translate(self, text):
+        if self.pattern is None:
+            return text
+        # เว้นวรรครอบคำที่แปล (ภาษาไทยเขียนติดกัน) แล้วยุบช่องว่างซ้ำ
+        return " ".join(self.pattern.sub(self._replace, text).split())
+
+
+@functools.lru_cache(maxsize=8)
+def _compiled(base_items):
+    return Translator({**dict(base_items), **load_vocab()})
+
+
+def get_translator(base=None):
+    # คอมไพล์ครั้งเดียวต่อ process ต่อชุดคำพื้นฐาน: คำพื้นฐานจากโค้ด (base) + ไฟล์ vocab (ไฟล์ทับ base ได้)
+    return _compiled(frozenset((base or {}).items()))
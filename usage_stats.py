@@ -0,0 +1,50 @@
+import db
+
+# ตัวนับสะสมของการวิเคราะห์ (เก็บใน merchant_data.db ใช้ร่วมกันทุก process) — ใช้วัดผลโหมด JSON
+#   analyses          จำนวนคำตอบจาก Gemini ที่ถูกแยกส่วน
+#   analyses_json     ในนั้นกี่ครั้งที่ขอแบบ JSON schema
+#   json_fallbacks    JSON ใช้ไม่ได้ ต้องถอยไปใช้ parse_result
+#   parse_failures    แยกส่วนแล้วยังได้ไม่ครบ 4 ส่วน
+#   analyze_requests  กดวิเคราะห์ในหน้าเว็บ
+#   reruns            กดวิเคราะห์ลิงก์เดิมซ้ำใน session เดียวกัน
+#   python usage_stats.py   -> พิมพ์ตัวนับและอัตราส่วน
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def incr(*names):
+    if names:
+        with db.session(schema=_SCHEMA) as conn:
+            conn.executemany("INSERT INTO usage_counters (name, value) VALUES (?, 1) "
+                             "ON CONFLICT(name) DO UPDATE SET value = value + 1", [(n,) for n in names])
+
+
+def snapshot():
+    with db.session(schema=_SCHEMA) as conn:
+        return dict(conn.execute("SELECT name, value FROM usage_counters"))
+
+
+def _ratio(a, b):
+    return round(a / b, 4) if b else 0.0
+
+
+def rates(counters=None):
+    c = counters if counters is not None else snapshot()
+    return {
+        'parse_failure_rate': _ratio(c.get('parse_failures', 0), c.get('analyses', 0)),
+        'json_fallback_rate': _ratio(c.get('json_fallbacks', 0), c.get('analyses_json', 0)),
+        'rerun_rate': _ratio(c.get('reruns', 0), c.get('analyze_requests', 0)),
+    }
+
+
+if __name__ == '__main__':
+    counters = snapshot()
+    for name, value in sorted(counters.items()):
+        print(f"{name:18} {value:,}")
+    for name, value in rates(counters).items():
+        print(f"{name:18} {value:.2%}")
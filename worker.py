@@ -0,0 +1,156 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+import db
+import job_queue
+
+# worker ของคิวงาน (job_queue) — รันแยกจาก Streamlit กี่ process ก็ได้ แต่ต้องอยู่เครื่องเดียวกับแอป
+# SQLite โหมด WAL ใช้ข้ามเครื่อง/ผ่าน network filesystem ไม่ได้ และงานสร้างภาพส่งต่อผ่านแคชภาพบนดิสก์เครื่องนี้
+#   python worker.py --processes 2 --threads 4     -> รับงานพร้อมกันได้ 8 งาน
+# ไม่มี worker ตัวไหนส่ง heartbeat -> หน้าเว็บกลับไปทำงานเองใน thread ของ session เหมือนเดิม
+# งานส่วนใหญ่รอเน็ต (ดึงหน้า/Gemini/pollinations) จึงใช้หลาย thread ต่อ process; หลาย process กัน GIL ตอน parse
+
+# --- CONFIG ---
+PROCESSES = 2
+THREADS = 4                 # งานพร้อมกันต่อ process
+IDLE_SLEEP = 0.5            # ไม่มีงานในคิว -> รอกี่วินาทีก่อนถามใหม่
+REPORT_EVERY = 0.2          # progress ระหว่าง stream เขียนลงฐานข้อมูลถี่สุดเท่านี้ (เปลี่ยนขั้นตอนเขียนทันที)
+PURGE_EVERY = 60 * 60
+
+logger = logging.getLogger('krobjang.worker')
+
+
+# --- HANDLERS ---
+def run_analyze(payload, report):
+    from krobjang_core import analyze_pipeline, init_gemini
+    model, ok = init_gemini(payload['api_key'])
+    if not ok:
+        raise job_queue.JobError("Gemini API Key ใช้ไม่ได้")
+    for stage, data in analyze_pipeline(model, payload['url'], payload['platform']):
+        if stage == 'done':
+            return data
+        report(stage, data)
+
+
+def run_scene(payload, report):
+    # ภาพเก็บในแคชดิสก์ของ image_cache — ผลของงานเป็นแค่ seed + key ให้หน้าเว็บเปิดไฟล์เอง
+    import image_cache
+    seed = payload.get('seed') or random.randint(1, 999999)
+    image_cache.fetch(payload['prompt'], seed)
+    return {'seed': seed, 'key': image_cache.cache_key(payload['prompt'], seed)}
+
+
+HANDLERS = {'analyze': run_analyze, 'scene': run_scene}
+
+
+def _reporter(job_id):
+    last = [None, 0.0]
+
+    def report(stage, data=None):
+        now = time.monotonic()
+        if stage == last[0] and now - last[1] < REPORT_EVERY:
+            return
+        last[:] = [stage, now]
+        job_queue.report(job_id, stage, data)
+    return report
+
+
+def run_one(name):
+    # คืน True ถ้าได้ทำงาน (มีงานในคิว)
+    job = job_queue.claim(name, list(HANDLERS))
+    if job is None:
+        return False
+    try:
+        result = HANDLERS[job['kind']](job['payload'], _reporter(job['id']))
+    except job_queue.JobError as e:
+        job_queue.fail(job['id'], str(e), retry=False, worker=name)
+    except Exception as e:
+        logger.exception("job %s (%s) ล้มเหลว รอบที่ %s", job['id'], job['kind'], job['attempts'])
+        job_queue.fail(job['id'], f"{type(e).__name__}: {e}", worker=name)
+    else:
+        job_queue.complete(job['id'], result, name)
+    return True
+
+
+def serve(name, threads=THREADS, stop=None):
+    # heartbeat ทุก HEARTBEAT_EVERY (ต่อ lease ของงานที่ค้างอยู่ด้วย) + thread ทำงาน `threads` ตัว
+    stop = stop or threading.Event()
+    pid = os.getpid()
+    job_queue.heartbeat(name, pid)
+
+    def beat():
+        last_purge = 0.0
+        while not stop.wait(job_queue.HEARTBEAT_EVERY):
+            try:
+                job_queue.heartbeat(name, pid)
+                if time.monotonic() - last_purge > PURGE_EVERY:
+                    job_queue.purge()
+                    last_purge = time.monotonic()
+            except Exception:
+                logger.exception("heartbeat")
+
+    def loop():
+        while not stop.is_set():
+            try:
+                busy = run_one(name)
+            except Exception:   # ฐานข้อมูลล็อกนาน ฯลฯ — อย่าให้ thread ตาย
+                logger.exception("worker loop")
+                busy = False
+            if not busy:
+                stop.wait(IDLE_SLEEP)
+
+    pool = [threading.Thread(target=beat, daemon=True)]
+    pool += [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    try:
+        while not stop.wait(1):
+            pass
+    finally:
+        stop.set()
+        for t in pool[1:]:
+            t.join(timeout=30)
+        job_queue.retire(name)
+
+
+def _process_main(index, threads):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    serve(f"{socket.gethostname()}:{os.getpid()}:{index}", threads, stop)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="worker ของคิวงาน Krobjang / SME Pro Studio")
+    parser.add_argument('--processes', type=int, default=int(os.environ.get('WORKER_PROCESSES', PROCESSES)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WORKER_THREADS', THREADS)),
+                        help="งานพร้อมกันต่อ process")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+
+    procs = [multiprocessing.Process(target=_process_main, args=(i, args.threads), name=f"worker-{i}")
+             for i in range(args.processes)]
+    for p in procs:
+        p.start()
+    print(f"worker {args.processes} process × {args.threads} thread -> {db.DB_PATH}", file=sys.stderr)
+
+    def shutdown(*_):
+        for p in procs:
+            if p.is_alive():
+                p.terminate()   # SIGTERM -> ทำงานที่ถืออยู่ให้จบแล้วออก
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for p in procs:
+        p.join()
+
+
+if __name__ == '__main__':
+    main()